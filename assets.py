@@ -0,0 +1,182 @@
+import concurrent.futures
+import json
+import os
+
+import pygame
+
+# Sprite Sizes
+PLAYER_SIZE = (50, 40)
+ENEMY_SIZE = (32, 32)
+SPACESHIP_SIZE = (50, 32)
+WALL_SIZE = (100, 100)
+BULLET_SIZE = (32, 30)
+
+# Animation frame tables: every frame the game draws, grouped by sprite type and in playback order
+ANIMATIONS = {
+    "player": (PLAYER_SIZE, ["Sprites/player/player.png"]),
+    "player-death": (PLAYER_SIZE, ["Sprites/player-death/player-death_img.png"]),
+    "enemy1": (ENEMY_SIZE, ["Sprites/enemy1/enemy1_0.png", "Sprites/enemy1/enemy1_1.png"]),
+    "enemy2": (ENEMY_SIZE, ["Sprites/enemy2/enemy2_0.png", "Sprites/enemy2/enemy2_1.png"]),
+    "enemy3": (ENEMY_SIZE, ["Sprites/enemy3/enemy3_0.png", "Sprites/enemy3/enemy3_1.png"]),
+    "enemy-death": (ENEMY_SIZE, [f"Sprites/enemy-death/enemy-death_{frame}.png" for frame in range(5)]),
+    "spaceship": (SPACESHIP_SIZE, ["Sprites/spaceship/spaceship_0.png", "Sprites/spaceship/spaceship_1.png"]),
+    "wall": (WALL_SIZE, ["Sprites/wall/wall.png"]),
+    "player_bullet": (BULLET_SIZE, ["Sprites/bullets/player_bullet.png"]),
+    "enemy_bullet": (BULLET_SIZE, ["Sprites/bullets/enemy_bullet.png"]),
+}
+
+# Every (path, size) pair the game draws, loaded up front by preload_assets()
+ASSET_MANIFEST = [(path, size) for size, paths in ANIMATIONS.values() for path in paths]
+
+# Prebuilt atlas written by build_atlas.py
+ATLAS_IMAGE = "Sprites/atlas.png"
+ATLAS_INDEX = "Sprites/atlas.json"
+ATLAS_WIDTH = 512
+
+_images = {}
+_masks = {}
+_frames = {}
+
+
+def _convert(image):
+    # convert_alpha() needs a display mode, so headless callers keep the plain surface
+    if pygame.display.get_surface() is not None:
+        return image.convert_alpha()
+    return image
+
+
+def _store(path, size, image):
+    _images[(path, size)] = image
+    _masks[(path, size)] = pygame.mask.from_surface(image)
+
+
+def decode_image(path, size):
+    return pygame.transform.scale(pygame.image.load(path), size)
+
+
+def _load(path, size):
+    _store(path, size, _convert(decode_image(path, size)))
+
+
+def get_image(path, size):
+    if (path, size) not in _images:
+        _load(path, size)
+    return _images[(path, size)]
+
+
+def get_mask(path, size):
+    if (path, size) not in _masks:
+        _load(path, size)
+    return _masks[(path, size)]
+
+
+def get_frames(name):
+    if name not in _frames:
+        size, paths = ANIMATIONS[name]
+        _frames[name] = [get_image(path, size) for path in paths]
+    return _frames[name]
+
+
+def get_masks(name):
+    size, paths = ANIMATIONS[name]
+    return [get_mask(path, size) for path in paths]
+
+
+def pack_atlas(manifest=ASSET_MANIFEST, width=ATLAS_WIDTH, decoded=None):
+    if decoded is None:
+        decoded = [decode_image(path, size) for path, size in manifest]
+    images = [(path, size, image) for (path, size), image in zip(manifest, decoded)]
+
+    # Shelf packing: tallest frames first, left to right, starting a new shelf when a row is full
+    images.sort(key=lambda item: item[1][1], reverse=True)
+    index = {}
+    x, y, shelf_height = 0, 0, 0
+    for path, (frame_width, frame_height), image in images:
+        if x + frame_width > width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        index[path] = [x, y, frame_width, frame_height]
+        x += frame_width
+        shelf_height = max(shelf_height, frame_height)
+
+    atlas = pygame.Surface((width, y + shelf_height), pygame.SRCALPHA)
+    for path, size, image in images:
+        # The atlas starts fully transparent, so the per-channel maximum copies colour and alpha exactly
+        atlas.blit(image, index[path][:2], special_flags=pygame.BLEND_RGBA_MAX)
+    return atlas, index
+
+
+def save_atlas(atlas, index, image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX):
+    pygame.image.save(atlas, image_path)
+    with open(index_path, "w") as index_file:
+        json.dump({"frames": index}, index_file, indent=1)
+
+
+def load_atlas(image_path=ATLAS_IMAGE, index_path=ATLAS_INDEX, manifest=ASSET_MANIFEST):
+    # A missing, stale or incomplete atlas is ignored and the frames are packed at load time instead
+    if not os.path.exists(image_path) or not os.path.exists(index_path):
+        return None
+    built = os.path.getmtime(image_path)
+    if any(os.path.getmtime(path) > built for path, size in manifest):
+        return None
+    with open(index_path, "r") as index_file:
+        index = json.load(index_file)["frames"]
+    if any(index.get(path, [])[2:] != list(size) for path, size in manifest):
+        return None
+    return pygame.image.load(image_path), index
+
+
+def install_atlas(atlas, index, manifest=ASSET_MANIFEST):
+    atlas = _convert(atlas)
+    for path, size in manifest:
+        _store(path, size, atlas.subsurface(index[path]))
+    _frames.clear()
+
+
+def preload_assets():
+    # One decode of the prebuilt atlas is much cheaper than decoding and scaling every source image
+    atlas, index = load_atlas() or pack_atlas()
+    install_atlas(atlas, index)
+
+
+class AssetStream:
+    def __init__(self, manifest=ASSET_MANIFEST):
+        self.manifest = manifest
+        self.executor = None
+        self.atlas_future = None
+        self.frame_futures = None
+        self.finished = False
+
+    def start(self, executor):
+        # Decoding happens on the pool; the game thread only packs, converts and builds masks in poll()
+        self.executor = executor
+        self.atlas_future = executor.submit(load_atlas, manifest=self.manifest)
+
+    def pending(self):
+        if self.frame_futures is not None:
+            return [future for future in self.frame_futures if not future.done()]
+        return [self.atlas_future] if not self.atlas_future.done() else []
+
+    def poll(self):
+        if self.finished or self.atlas_future is None:
+            return self.finished
+        if self.pending():
+            return False
+        if self.frame_futures is None:
+            prebuilt = self.atlas_future.result()
+            if prebuilt is None:
+                self.frame_futures = [self.executor.submit(decode_image, path, size) for path, size in self.manifest]
+                return False
+            atlas, index = prebuilt
+        else:
+            atlas, index = pack_atlas(self.manifest, decoded=[future.result() for future in self.frame_futures])
+        install_atlas(atlas, index, self.manifest)
+        self.finished = True
+        return True
+
+    def wait(self):
+        # Callers that never started the stream, like tools and smoke tests, just load on the spot
+        if self.atlas_future is None:
+            preload_assets()
+            self.finished = True
+        while not self.poll():
+            concurrent.futures.wait(self.pending())
@@ -0,0 +1,283 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+from drawing import create_game_fonts, draw_game
+from env import ACTIONS, InvadersEnv, VectorInvadersEnv
+from headless import swarm_size
+from render import DirtyRenderer
+from simulation import (Simulation, create_new_enemies, create_new_walls, manage_enemy_movement, WIDTH, HEIGHT,
+                        SCREEN_MARGIN, ENEMY_START_Y, ENEMY_BULLET_CAPACITY)
+
+BENCHMARK_SIZES = (50, 500, 5000)
+BENCHMARK_BULLETS = 200
+BENCHMARK_RESULTS_FILE = "benchmark_results.json"
+
+# Iterations at 50 invaders; bigger swarms run proportionally fewer, but never below MIN_ITERATIONS
+BASE_ITERATIONS = 500
+MIN_ITERATIONS = 50
+WARMUP_ITERATIONS = 3
+
+# Games stepped together by the vectorized environment benchmark
+VECTOR_ENVS = 8
+
+# A median this much slower than the baseline counts as a regression
+REGRESSION_TOLERANCE = 0.2
+
+
+def measure(setup, operation, iterations, steps=None):
+    for _ in range(WARMUP_ITERATIONS):
+        setup()
+        operation()
+
+    # Only the operation is timed; setup puts the state back between calls
+    times = []
+    for _ in range(iterations):
+        setup()
+        start = time.perf_counter()
+        operation()
+        times.append((time.perf_counter() - start) * 1e6)
+
+    # Allocations are measured on a separate call since tracing slows everything down
+    setup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    operation()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "iterations": iterations,
+        "median_us": statistics.median(times),
+        "mean_us": statistics.fmean(times),
+        "min_us": min(times),
+        "p95_us": float(np.percentile(times, 95)),
+        "peak_kib": (peak - before) / 1024,
+        "net_kib": (current - before) / 1024,
+    }
+    # Environment benchmarks also report throughput, in game steps per second on one core
+    if steps:
+        result["steps_per_s"] = steps * 1e6 / result["median_us"]
+    return result
+
+
+def fill_enemy_bullets(sim, rng, count):
+    formation = sim.enemy_manager
+    owners = np.flatnonzero(formation.alive)
+    while len(formation.bullets) < min(count, ENEMY_BULLET_CAPACITY):
+        owner = owners[rng.randrange(len(owners))]
+        formation.bullets.fire(rng.uniform(SCREEN_MARGIN, WIDTH - SCREEN_MARGIN), rng.uniform(ENEMY_START_Y, HEIGHT),
+                               owner)
+        formation.bullet_count[owner] += 1
+
+
+def reset_walls(sim):
+    sim.walls.empty()
+    create_new_walls(sim.walls)
+
+
+def bench_create_new_enemies(sim, rng, bullets):
+    def setup():
+        pass
+
+    def operation():
+        create_new_enemies(sim.enemy_manager, ENEMY_START_Y, sim.swarm_size)
+    return setup, operation
+
+
+def bench_manage_enemy_movement(sim, rng, bullets):
+    formation = sim.enemy_manager
+
+    def setup():
+        # Start the wave over before it marches off the bottom
+        if formation.y.max() > HEIGHT - 100:
+            create_new_enemies(formation, ENEMY_START_Y, sim.swarm_size)
+
+    def operation():
+        manage_enemy_movement(formation)
+    return setup, operation
+
+
+def bench_player_update(sim, rng, bullets):
+    player = sim.player.sprite
+    formation = sim.enemy_manager
+
+    def setup():
+        # Fire into the middle of the swarm so the broadphase and mask tests have work to do
+        formation.hit[:] = False
+        player.bullets.clear()
+        player.bullets.fire(formation.x.mean(), formation.y.mean())
+
+    def operation():
+        player.update(0, formation, sim.spaceship_enemy, sim.walls, sim.events)
+    return setup, operation
+
+
+def bench_formation_update(sim, rng, bullets):
+    player = sim.player.sprite
+    formation = sim.enemy_manager
+
+    def setup():
+        formation.alive[:] = True
+        player.is_dying = False
+        reset_walls(sim)
+        fill_enemy_bullets(sim, rng, bullets)
+
+    def operation():
+        formation.update(player, sim.walls, sim.events)
+    return setup, operation
+
+
+def bench_render_frame(sim, rng, bullets):
+    fonts = create_game_fonts()
+    renderer = DirtyRenderer(pygame.display.get_surface())
+    player = sim.player.sprite
+
+    def setup():
+        player.is_dying = False
+        fill_enemy_bullets(sim, rng, bullets)
+        renderer.invalidate()
+
+    def operation():
+        draw_game(renderer, sim, fonts, 0.5)
+        renderer.present()
+    return setup, operation
+
+
+def bench_env_step(observation):
+    def bench(sim, rng, bullets):
+        env = InvadersEnv(observation, sim.swarm_size)
+        env.reset(sim.seed)
+        action = [0]
+
+        def setup():
+            if env.done:
+                env.reset()
+            action[0] = rng.randrange(len(ACTIONS))
+
+        def operation():
+            env.step(action[0])
+        return setup, operation
+    return bench
+
+
+def bench_vector_env_step(sim, rng, bullets):
+    envs = VectorInvadersEnv(VECTOR_ENVS, "state", swarm_size=sim.swarm_size)
+    envs.reset(sim.seed)
+    actions = [0] * VECTOR_ENVS
+
+    def setup():
+        actions[:] = [rng.randrange(len(ACTIONS)) for _ in range(VECTOR_ENVS)]
+
+    def operation():
+        envs.step(actions)
+    return setup, operation
+
+
+BENCHMARKS = {
+    "create_new_enemies": bench_create_new_enemies,
+    "manage_enemy_movement": bench_manage_enemy_movement,
+    "player_update": bench_player_update,
+    "formation_update": bench_formation_update,
+    "render_frame": bench_render_frame,
+    "env_step_state": bench_env_step("state"),
+    "env_step_pixels": bench_env_step("pixels"),
+    "vector_env_step": bench_vector_env_step,
+}
+
+# Game steps taken by one call of the environment benchmarks
+BENCHMARK_STEPS = {
+    "env_step_state": 1,
+    "env_step_pixels": 1,
+    "vector_env_step": VECTOR_ENVS,
+}
+
+
+def run_benchmarks(names, sizes, bullets, base_iterations, seed):
+    results = {}
+    for size in sizes:
+        iterations = max(MIN_ITERATIONS, base_iterations * 50 // size)
+        for name in names:
+            sim = Simulation(seed, size)
+            setup, operation = BENCHMARKS[name](sim, random.Random(seed), bullets)
+            results[f"{name}[{size}]"] = result = measure(setup, operation, iterations, BENCHMARK_STEPS.get(name))
+            throughput = f", {result['steps_per_s']:.0f} steps/s" if "steps_per_s" in result else ""
+            print(f"{name}[{size}]: median {result['median_us']:.1f} us, p95 {result['p95_us']:.1f} us, "
+                  f"peak {result['peak_kib']:.1f} KiB, net {result['net_kib']:.1f} KiB{throughput}")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result["median_us"] / baseline[key]["median_us"]
+        if ratio > 1 + tolerance:
+            status = "REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 - tolerance:
+            status = "improved"
+        else:
+            status = "ok"
+        print(f"{key}: {baseline[key]['median_us']:.1f} -> {result['median_us']:.1f} us ({ratio:.2f}x) {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the simulation and rendering hot paths.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run")
+    parser.add_argument("--sizes", nargs="+", type=swarm_size, default=list(BENCHMARK_SIZES), help="invaders per wave")
+    parser.add_argument("--bullets", type=int, default=BENCHMARK_BULLETS,
+                        help="enemy bullets in flight, up to the pool capacity")
+    parser.add_argument("--iterations", type=int, default=BASE_ITERATIONS, help="timed calls at 50 invaders")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the simulations and bullet placement")
+    parser.add_argument("--output", default=BENCHMARK_RESULTS_FILE, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed slowdown of the median before it counts as a regression")
+    args = parser.parse_args()
+
+    # The window exists before any sprite is loaded so they are converted to the display format, as in the game
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+
+    results = run_benchmarks(args.only, args.sizes, args.bullets, args.iterations, args.seed)
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "bullets": args.bullets,
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=1)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as baseline:
+            regressions = compare(results, json.load(baseline)["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
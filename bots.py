@@ -0,0 +1,26 @@
+import numpy as np
+
+from simulation import INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE
+
+
+def scripted_bot(sim):
+    player = sim.player.sprite
+    formation = sim.enemy_manager
+    center = player.x + player.width / 2
+
+    # Step out from under any enemy bullet about to land on the player
+    bullets = formation.bullets
+    for bullet in bullets.live:
+        bullet_center = bullets.x[bullet] + bullets.width / 2
+        if player.y - 150 < bullets.y[bullet] < player.y and abs(bullet_center - center) < player.width:
+            return (INPUT_LEFT if bullet_center > center else INPUT_RIGHT) | INPUT_FIRE
+
+    targets = formation.x[formation.alive & ~formation.hit] + formation.width / 2
+    if not len(targets):
+        return INPUT_FIRE
+    target_center = targets[np.abs(targets - center).argmin()]
+    if target_center < center - player.vel:
+        return INPUT_LEFT | INPUT_FIRE
+    if target_center > center + player.vel:
+        return INPUT_RIGHT | INPUT_FIRE
+    return INPUT_FIRE
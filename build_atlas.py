@@ -0,0 +1,34 @@
+import argparse
+import glob
+import time
+
+from assets import ASSET_MANIFEST, ATLAS_IMAGE, ATLAS_INDEX, ATLAS_WIDTH, load_atlas, pack_atlas, save_atlas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack every sprite frame under Sprites/ into one atlas image.")
+    parser.add_argument("--width", type=int, default=ATLAS_WIDTH, help="atlas width in pixels")
+    parser.add_argument("--image", default=ATLAS_IMAGE, help="where to write the atlas image")
+    parser.add_argument("--index", default=ATLAS_INDEX, help="where to write the frame index")
+    args = parser.parse_args()
+
+    listed = {path for path, size in ASSET_MANIFEST}
+    for path in sorted(glob.glob("Sprites/**/*.png", recursive=True)):
+        if path not in listed and path != args.image:
+            print(f"skipping {path}: not in any animation table")
+
+    start = time.perf_counter()
+    atlas, index = pack_atlas(ASSET_MANIFEST, args.width)
+    packed = time.perf_counter() - start
+    save_atlas(atlas, index, args.image, args.index)
+
+    start = time.perf_counter()
+    load_atlas(args.image, args.index)
+    loaded = time.perf_counter() - start
+
+    print(f"packed {len(index)} frames into {atlas.get_width()}x{atlas.get_height()} {args.image}")
+    print(f"decoding the sources took {packed * 1000:.0f} ms, loading the atlas takes {loaded * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import json
+import multiprocessing
+import os
+import struct
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+# Finished frames waiting for a writer. When all of them are in use the new frame is dropped and counted,
+# so a slow disk or a busy CPU never stalls the game.
+CAPTURE_RING_SIZE = 8
+# Writers are separate processes at a lower priority, so encoding competes with the game neither for the GIL
+# nor, on a busy machine, for the CPU. PNG frames are independent, so several writers compress at once.
+PNG_WRITERS = 2
+WRITER_NICENESS = 10
+PNG_COMPRESSION = 1
+# Frame numbers of this many drops are kept for the summary; past that they are only counted
+DROPPED_FRAMES_KEPT = 1000
+RAW_EXTENSION = ".raw"
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# ffmpeg names for the 32-bit layouts a window surface comes in, keyed by the red, green and blue shifts
+_RAW_PIXEL_FORMATS = {(16, 8, 0): "bgr0", (0, 8, 16): "rgb0", (24, 16, 8): "0bgr", (8, 16, 24): "0rgb"}
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(rows, width, height, level=PNG_COMPRESSION):
+    # rows holds each scanline as a filter byte followed by RGB triples
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (_PNG_SIGNATURE + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(rows, level))
+            + _png_chunk(b"IEND", b""))
+
+
+def _write_frames(memory_name, shape, shifts, path, raw, filled, free, written, ready):
+    # Where the OS has an idle class, writers only get the CPU the game leaves over
+    if hasattr(os, "SCHED_IDLE"):
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    elif hasattr(os, "nice"):
+        os.nice(WRITER_NICENESS)
+    memory = shared_memory.SharedMemory(memory_name)
+    buffers = np.ndarray(shape, dtype=np.uint32, buffer=memory.buf)
+    ring_size, height, width = shape
+    channels = [shift // 8 for shift in shifts]
+    rows = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    rgb = rows[:, 1:].reshape(height, width, 3)
+    output = open(path, "ab") if raw else None
+    ready.set()
+    while True:
+        item = filled.get()
+        if item is None:
+            break
+        index, frame = item
+        if raw:
+            output.write(buffers[index])
+            free.put(index)
+        else:
+            pixels = buffers[index].view(np.uint8).reshape(height, width, 4)
+            for channel, byte in enumerate(channels):
+                rgb[:, :, channel] = pixels[:, :, byte]
+            free.put(index)
+            with open(os.path.join(path, f"frame_{frame:06d}.png"), "wb") as png_file:
+                png_file.write(encode_png(rows, width, height))
+        with written.get_lock():
+            written.value += 1
+    if output is not None:
+        output.close()
+    del buffers
+    memory.close()
+
+
+class FrameCapture:
+    def __init__(self, path, fps=60, ring_size=CAPTURE_RING_SIZE):
+        # A path ending in .raw gets one raw video stream plus a .json description; anything else is a
+        # directory of numbered PNG frames
+        self.path = path
+        self.raw = path.endswith(RAW_EXTENSION)
+        self.fps = fps
+        self.ring_size = ring_size
+        self.size = None
+        self.memory = None
+        self.buffers = None
+        self.writers = []
+        self.frames = 0
+        self.dropped_count = 0
+        self.dropped = []
+
+    def start(self, surface):
+        # Starting the writers takes a moment, so callers that know the frame size start before the first frame
+        if surface.get_bytesize() != 4:
+            raise ValueError(f"frame capture needs a 32-bit surface, not {surface.get_bitsize()}-bit")
+        self.size = width, height = surface.get_size()
+        self.shifts = surface.get_shifts()[:3]
+        shape = (self.ring_size, height, width)
+        self.memory = shared_memory.SharedMemory(create=True, size=self.ring_size * height * width * 4)
+        self.buffers = np.ndarray(shape, dtype=np.uint32, buffer=self.memory.buf)
+
+        if self.raw:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            open(self.path, "wb").close()
+        else:
+            os.makedirs(self.path, exist_ok=True)
+        # Spawned rather than forked, since the game process has audio, loader and network threads running
+        context = multiprocessing.get_context("spawn")
+        self.filled = context.SimpleQueue()
+        self.free = context.SimpleQueue()
+        self.written = context.Value("i", 0)
+        for index in range(self.ring_size):
+            self.free.put(index)
+        events = []
+        for _ in range(1 if self.raw else PNG_WRITERS):
+            ready = context.Event()
+            writer = context.Process(target=_write_frames, daemon=True,
+                                     args=(self.memory.name, shape, self.shifts, self.path, self.raw, self.filled,
+                                           self.free, self.written, ready))
+            writer.start()
+            self.writers.append(writer)
+            events.append(ready)
+        # A spawned writer imports the game before it can take a frame; without waiting, the ring fills up
+        # and the first frames of every recording are dropped
+        for writer, ready in zip(self.writers, events):
+            while not ready.wait(0.1):
+                if not writer.is_alive():
+                    raise RuntimeError(f"frame writer exited with code {writer.exitcode} before it started")
+
+    def grab(self, surface):
+        # Called from the game thread after each present; the only work here is one copy into a free buffer
+        if self.size is None:
+            self.start(surface)
+        frame = self.frames
+        self.frames += 1
+        # The game thread is the only reader of the free queue, so a non-empty queue can't block
+        if surface.get_size() != self.size or self.free.empty():
+            self.dropped_count += 1
+            if len(self.dropped) < DROPPED_FRAMES_KEPT:
+                self.dropped.append(frame)
+            return
+        index = self.free.get()
+        pixels = pygame.surfarray.pixels2d(surface)
+        np.copyto(self.buffers[index].T, pixels)
+        del pixels
+        self.filled.put((index, frame))
+
+    def close(self):
+        if self.size is None:
+            return "no frames captured"
+        for _ in self.writers:
+            self.filled.put(None)
+        for writer in self.writers:
+            writer.join()
+        self.buffers = None
+        self.memory.close()
+        self.memory.unlink()
+        summary = f"{self.written.value} frames written to {self.path}, {self.dropped_count} dropped"
+        if not self.raw:
+            return summary
+
+        width, height = self.size
+        pixel_format = _RAW_PIXEL_FORMATS.get(self.shifts, "unknown")
+        description = {
+            "width": width,
+            "height": height,
+            "pixel_format": pixel_format,
+            "fps": self.fps,
+            "frames": self.written.value,
+            "dropped": self.dropped_count,
+            # The first DROPPED_FRAMES_KEPT of them
+            "dropped_frames": self.dropped,
+            "convert": f"ffmpeg -f rawvideo -pixel_format {pixel_format} -video_size {width}x{height} "
+                       f"-framerate {self.fps} -i {self.path} -c:v ffv1 capture.mkv",
+        }
+        with open(self.path + ".json", "w") as description_file:
+            json.dump(description, description_file, indent=1)
+        return summary
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def rect_overlaps(x, y, width, height, b):
+    return x < b.x + b.width and b.x < x + width and y < b.y + b.height and b.y < y + height
+
+
+class SpatialGrid:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def _cells(self, x, y, width, height):
+        size = self.cell_size
+        for cell_x in range(int(x // size), int((x + width) // size) + 1):
+            for cell_y in range(int(y // size), int((y + height) // size) + 1):
+                yield cell_x, cell_y
+
+    def clear(self):
+        self.cells.clear()
+
+    def insert(self, item, x, y, width, height):
+        for cell in self._cells(x, y, width, height):
+            self.cells.setdefault(cell, []).append(item)
+
+    def insert_many(self, items, x, y, width, height):
+        # Same cells as calling insert() on each item in turn, worked out with array operations for a whole
+        # batch of equally sized items; each cell still lists its items in insertion order
+        size = self.cell_size
+        first_x, first_y = np.floor_divide(x, size).astype(int), np.floor_divide(y, size).astype(int)
+        last_x = np.floor_divide(x + width, size).astype(int)
+        last_y = np.floor_divide(y + height, size).astype(int)
+        cells_x, cells_y, members = [], [], []
+        for dx in range(int((last_x - first_x).max(initial=0)) + 1):
+            for dy in range(int((last_y - first_y).max(initial=0)) + 1):
+                covered = (first_x + dx <= last_x) & (first_y + dy <= last_y)
+                cells_x.append(first_x[covered] + dx)
+                cells_y.append(first_y[covered] + dy)
+                members.append(np.flatnonzero(covered))
+        cells_x, cells_y, members = np.concatenate(cells_x), np.concatenate(cells_y), np.concatenate(members)
+        order = np.lexsort((members, cells_y, cells_x))
+        cells_x, cells_y, members = cells_x[order], cells_y[order], members[order].tolist()
+        starts = np.flatnonzero(np.diff(cells_x, prepend=cells_x[:1] - 1) | np.diff(cells_y, prepend=cells_y[:1] - 1))
+        # Cells share one object per item, as they would after insert()
+        items = list(items)
+        for start, end, cell_x, cell_y in zip(starts.tolist(), np.append(starts[1:], len(order)).tolist(),
+                                              cells_x[starts].tolist(), cells_y[starts].tolist()):
+            self.cells.setdefault((cell_x, cell_y), []).extend([items[member] for member in members[start:end]])
+
+    def remove(self, item):
+        for items in self.cells.values():
+            if item in items:
+                items.remove(item)
+
+    def query(self, x, y, width, height):
+        # A dict keeps insertion order, so results are deduplicated and deterministic
+        found = {}
+        for cell in self._cells(x, y, width, height):
+            for item in self.cells.get(cell, ()):
+                found[item] = None
+        return list(found)
@@ -0,0 +1,98 @@
+from fonts import get_font
+from profiler import profiler
+from simulation import WIDTH, HEIGHT, SCREEN_MARGIN
+from text_cache import render_text
+
+# Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (88, 255, 0)
+
+
+def create_game_fonts():
+    main_font = get_font(32)
+    small_font = get_font(24)
+    game_over_font = get_font(64)
+    return main_font, small_font, game_over_font
+
+
+def draw_player(screen, player, alpha):
+    screen.blits(player.bullets.sprites(alpha))
+    screen.blit(player.image, interpolate(player, alpha))
+
+
+def draw_player_death(screen, player):
+    screen.begin(GREEN)
+    screen.blit(player.death_image, (player.x, player.y))
+
+
+def draw_formation(screen, formation, alpha):
+    screen.blits(formation.bullets.sprites(alpha))
+    screen.blits(formation.sprites())
+
+
+def draw_spaceship(screen, ship, main_font, alpha):
+    if not ship.hit:
+        screen.blit(ship.image, interpolate(ship, alpha))
+    elif not 15 < ship.death_animation_counter < 25:
+        death_label = render_text(main_font, f"{ship.points}", WHITE)
+        screen.blit(death_label, (ship.x, ship.y))
+
+
+def draw_wall(screen, wall, small_font):
+    health_label = render_text(small_font, f"{wall.health}", WHITE)
+    screen.blit(health_label, (wall.x + wall.width / 2, wall.y + wall.height))
+    screen.blit(wall.image, (wall.x, wall.y), wall.version)
+
+
+def draw_game(screen, sim, fonts, alpha, high_scores=None):
+    main_font, small_font, game_over_font = fonts
+    player = sim.player.sprite
+
+    if sim.game_over:
+        game_over_screen(screen, game_over_font, main_font, player.score, high_scores)
+        return
+    if player.is_dying:
+        draw_player_death(screen, player)
+        return
+
+    screen.begin(BLACK)
+    draw_player(screen, player, alpha)
+
+    draw_formation(screen, sim.enemy_manager, alpha)
+
+    if sim.spaceship_enemy is not None:
+        draw_spaceship(screen, sim.spaceship_enemy, main_font, alpha)
+
+    for wall in sim.walls:
+        draw_wall(screen, wall, small_font)
+
+    with profiler.scope("hud"):
+        current_score_label = render_text(main_font, f"Score: {player.score}", WHITE)
+        lives_label = render_text(small_font, f"Lives: {player.lives}", WHITE)
+        level_label = render_text(small_font, f"Level: {sim.current_level}", WHITE)
+        top_score = high_scores.top_score() if high_scores is not None else 0
+        high_score_label = render_text(main_font, f"High Score: {top_score}", WHITE)
+    screen.blit(current_score_label, (center_label(current_score_label) - 50, 10))
+    screen.blit(lives_label, (SCREEN_MARGIN, 10))
+    screen.blit(level_label, (SCREEN_MARGIN, 10 + level_label.get_height()))
+    screen.blit(high_score_label, (WIDTH - high_score_label.get_width() - SCREEN_MARGIN, 10))
+
+
+def game_over_screen(screen, game_over_font, main_font, player_score, high_scores=None):
+    screen.begin(GREEN)
+    game_over_label = render_text(game_over_font, "Game Over!!!", BLACK)
+    high_score_label = render_text(main_font, f"New High Score!!! {player_score}", BLACK)
+    screen.blit(game_over_label, (center_label(game_over_label), HEIGHT / 2 - game_over_label.get_height()))
+    if high_scores is not None and high_scores.is_new_high_score(player_score):
+        screen.blit(high_score_label, (center_label(high_score_label), HEIGHT / 2 + high_score_label.get_height()))
+
+
+def center_label(label):
+    return WIDTH / 2 - label.get_width() / 2
+
+
+def interpolate(sprite, alpha):
+    return (sprite.prev_x + (sprite.x - sprite.prev_x) * alpha,
+            sprite.prev_y + (sprite.y - sprite.prev_y) * alpha)
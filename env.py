@@ -0,0 +1,171 @@
+import numpy as np
+import pygame
+
+from headless import DEFAULT_MAX_TICKS
+from drawing import create_game_fonts, draw_game
+from render import SurfaceRenderer
+from simulation import Simulation, WIDTH, HEIGHT, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE
+
+# Discrete action space: an action is an index into this table of input bits
+ACTIONS = (0, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE, INPUT_LEFT | INPUT_FIRE, INPUT_RIGHT | INPUT_FIRE)
+ACTION_NAMES = ("noop", "left", "right", "fire", "left+fire", "right+fire")
+
+OBSERVATION_TYPES = ("state", "pixels")
+
+# Enemy bullets in the state vector, lowest on screen first
+OBSERVED_ENEMY_BULLETS = 8
+
+# Player x, lives, dying, level, march direction, player bullet (active, x, y), spaceship (active, x, y)
+_GLOBAL_FEATURES = 11
+
+
+def state_size(swarm_size):
+    # Fixed features, then (active, x, y) for each observed enemy bullet and for each invader slot
+    return _GLOBAL_FEATURES + 3 * OBSERVED_ENEMY_BULLETS + 3 * swarm_size
+
+
+def observe_state(sim, out):
+    out[:] = 0
+    player = sim.player.sprite
+    formation = sim.enemy_manager
+    out[0] = player.x / WIDTH
+    out[1] = player.lives
+    out[2] = player.is_dying
+    out[3] = sim.current_level
+    out[4] = 1 if formation.should_move_right else -1
+
+    bullets = player.bullets
+    if bullets.live:
+        bullet = bullets.live[0]
+        out[5:8] = 1, bullets.x[bullet] / WIDTH, bullets.y[bullet] / HEIGHT
+    ship = sim.spaceship_enemy
+    if ship is not None:
+        out[8:11] = 1, ship.x / WIDTH, ship.y / HEIGHT
+
+    bullets = formation.bullets
+    lowest = sorted(bullets.live, key=bullets.y.__getitem__, reverse=True)[:OBSERVED_ENEMY_BULLETS]
+    slots = out[_GLOBAL_FEATURES:_GLOBAL_FEATURES + 3 * OBSERVED_ENEMY_BULLETS].reshape(-1, 3)
+    for slot, bullet in zip(slots, lowest):
+        slot[:] = 1, bullets.x[bullet] / WIDTH, bullets.y[bullet] / HEIGHT
+
+    # Waves always fill the same slots, so an invader keeps its place in the vector for its whole life
+    invaders = out[_GLOBAL_FEATURES + 3 * OBSERVED_ENEMY_BULLETS:].reshape(-1, 3)
+    count = len(formation.x)
+    invaders[:count, 0] = formation.alive & ~formation.hit
+    invaders[:count, 1] = formation.x / WIDTH
+    invaders[:count, 2] = formation.y / HEIGHT
+
+
+class InvadersEnv:
+    def __init__(self, observation="state", swarm_size=50, max_ticks=DEFAULT_MAX_TICKS, frame_skip=1,
+                 difficulty=None, buffer=None, seed_stride=1):
+        if observation not in OBSERVATION_TYPES:
+            raise ValueError(f"observation must be one of {', '.join(OBSERVATION_TYPES)}, not {observation!r}")
+        self.observation_type = observation
+        self.swarm_size = swarm_size
+        self.max_ticks = max_ticks
+        self.frame_skip = frame_skip
+        self.difficulty = difficulty
+        self.seed_stride = seed_stride
+        self.next_seed = None
+        self.sim = None
+        self.done = True
+
+        if observation == "state":
+            self.observation_shape = (state_size(swarm_size),)
+            self.buffer = np.zeros(self.observation_shape, dtype=np.float32) if buffer is None else buffer
+            self.observation = self.buffer
+        else:
+            self.observation_shape = (HEIGHT, WIDTH, 3)
+            self.buffer = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8) if buffer is None else buffer
+            # The surface draws straight into the NumPy buffer, so the observation is a view and never a copy.
+            # surfarray.pixels3d would give the same view, but it keeps the surface locked, and blits into a
+            # locked surface fail while the caller still holds the previous observation. The buffer is stored in
+            # the same BGRA order as the sprites so blits don't convert pixels; the RGB view just walks it backwards.
+            self.surface = pygame.image.frombuffer(self.buffer, (WIDTH, HEIGHT), "BGRA")
+            self.observation = self.buffer[:, :, 2::-1]
+            pygame.font.init()
+            self.fonts = create_game_fonts()
+            self.renderer = SurfaceRenderer(self.surface)
+
+    @property
+    def action_count(self):
+        return len(ACTIONS)
+
+    def _observe(self):
+        if self.observation_type == "state":
+            observe_state(self.sim, self.buffer)
+        else:
+            draw_game(self.renderer, self.sim, self.fonts, 1.0)
+            self.renderer.present()
+        return self.observation
+
+    def _info(self):
+        player = self.sim.player.sprite
+        return {"score": player.score, "lives": player.lives, "level": self.sim.current_level, "ticks": self.sim.ticks}
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.next_seed = seed
+        seed = self.next_seed
+        if seed is not None:
+            self.next_seed = seed + self.seed_stride
+        self.sim = Simulation(seed, self.swarm_size, self.difficulty)
+        self.done = False
+        if self.observation_type == "pixels":
+            self.renderer.invalidate()
+        return self._observe(), self._info()
+
+    def step(self, action):
+        if self.done:
+            raise RuntimeError("step() called on a finished game; call reset() first")
+        sim = self.sim
+        inputs = ACTIONS[action]
+        score = sim.player.sprite.score
+        for _ in range(self.frame_skip):
+            sim.step(inputs)
+            if sim.game_over:
+                break
+        reward = sim.player.sprite.score - score
+        terminated = sim.game_over
+        truncated = not terminated and sim.ticks >= self.max_ticks
+        self.done = terminated or truncated
+        return self._observe(), reward, terminated, truncated, self._info()
+
+
+class VectorInvadersEnv:
+    def __init__(self, count, observation="state", **options):
+        # Every game writes its observation into its own row of one array, which is the batch handed back
+        if observation == "state":
+            self.buffer = np.zeros((count, state_size(options.get("swarm_size", 50))), dtype=np.float32)
+            self.observations = self.buffer
+        else:
+            self.buffer = np.zeros((count, HEIGHT, WIDTH, 4), dtype=np.uint8)
+            self.observations = self.buffer[..., 2::-1]
+        self.envs = [InvadersEnv(observation, buffer=self.buffer[index], seed_stride=count, **options)
+                     for index in range(count)]
+        self.rewards = np.zeros(count, dtype=np.int64)
+        self.terminated = np.zeros(count, dtype=bool)
+        self.truncated = np.zeros(count, dtype=bool)
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self, seed=None):
+        infos = []
+        for index, env in enumerate(self.envs):
+            infos.append(env.reset(None if seed is None else seed + index)[1])
+        return self.observations, infos
+
+    def step(self, actions):
+        # Finished games restart straight away; their info keeps the final score under "final_info"
+        infos = []
+        for index, (env, action) in enumerate(zip(self.envs, actions)):
+            _, reward, terminated, truncated, info = env.step(action)
+            if terminated or truncated:
+                info = {**env.reset()[1], "final_info": info}
+            self.rewards[index] = reward
+            self.terminated[index] = terminated
+            self.truncated[index] = truncated
+            infos.append(info)
+        return self.observations, self.rewards, self.terminated, self.truncated, infos
@@ -0,0 +1,24 @@
+import pygame
+
+FONT_NAME = "bahnschrift"
+
+_fonts = {}
+_font_path = None
+_font_resolved = False
+
+
+def resolve_font_path():
+    global _font_path, _font_resolved
+    # Looking a system font up scans every installed font, so it is done once per run. When the font is
+    # missing, None selects the default font that ships inside pygame.
+    if not _font_resolved:
+        _font_path = pygame.font.match_font(FONT_NAME)
+        _font_resolved = True
+    return _font_path
+
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(resolve_font_path(), size)
+    return font
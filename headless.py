@@ -0,0 +1,72 @@
+import argparse
+import os
+import time
+
+from bots import scripted_bot
+from profiler import profiler
+from simulation import Simulation
+
+
+def use_dummy_drivers():
+    # Headless runs never open a window or an audio device. SDL reads these when pygame's display and mixer are
+    # initialised, so this only has to come before that.
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+# The tools built on this module get the dummy drivers by importing it
+use_dummy_drivers()
+
+# Ten minutes of play at the simulation rate
+DEFAULT_MAX_TICKS = 36000
+
+
+def swarm_size(text):
+    count = int(text)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"a wave needs at least one invader, not {count}")
+    return count
+
+
+def run_game(seed, max_ticks=DEFAULT_MAX_TICKS, bot=scripted_bot, swarm_size=50, difficulty=None):
+    sim = Simulation(seed, swarm_size, difficulty)
+    while not sim.game_over and sim.ticks < max_ticks:
+        profiler.next_frame()
+        with profiler.scope("input"):
+            inputs = bot(sim)
+        sim.step(inputs)
+    profiler.end_frame()
+    return sim
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded Space Invaders games without a display.")
+    parser.add_argument("--games", type=int, default=10, help="number of games to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS, help="stop a game after this many ticks")
+    parser.add_argument("--swarm", type=swarm_size, default=50, help="invaders per wave")
+    parser.add_argument("--profile", metavar="PATH", help="record every tick and write a .csv or .json trace")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler.start(history=None)
+
+    total_ticks = 0
+    start = time.perf_counter()
+    for seed in range(args.seed, args.seed + args.games):
+        sim = run_game(seed, args.max_ticks, swarm_size=args.swarm)
+        total_ticks += sim.ticks
+        print(f"seed {seed}: score {sim.player.sprite.score}, level {sim.current_level}, ticks {sim.ticks}")
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.games} games, {total_ticks} ticks in {elapsed:.2f}s "
+          f"({args.games / elapsed:.2f} games/s, {total_ticks / elapsed:.0f} ticks/s)")
+
+    if args.profile:
+        frame_times = profiler.percentiles()
+        print(f"tick p50 {frame_times[50]:.3f} ms, p95 {frame_times[95]:.3f} ms, p99 {frame_times[99]:.3f} ms")
+        print(f"trace written to {profiler.export(args.profile)}")
+
+
+if __name__ == '__main__':
+    main()
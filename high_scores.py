@@ -0,0 +1,84 @@
+import csv
+import os
+import queue
+import threading
+
+HIGH_SCORE_FILE = "high_score.csv"
+LEADERBOARD_SIZE = 10
+INITIALS_LENGTH = 3
+
+
+class HighScoreTable:
+    def __init__(self, path=HIGH_SCORE_FILE, size=LEADERBOARD_SIZE):
+        self.path = path
+        self.size = size
+        self.entries = []
+        self._pending = queue.Queue()
+        self._writer = None
+
+    def load(self):
+        self.entries = []
+        try:
+            with open(self.path, "r", newline="") as high_score:
+                rows = [row for row in csv.reader(high_score) if row]
+        except FileNotFoundError:
+            return
+        for row in rows:
+            # Older files hold a single score with no initials, and 0 when nobody has played yet
+            if len(row) == 1:
+                if int(row[0]) > 0:
+                    self.entries.append(("---", int(row[0])))
+            else:
+                self.entries.append((row[0], int(row[1])))
+        self.entries.sort(key=lambda entry: entry[1], reverse=True)
+        del self.entries[self.size:]
+
+    def top_score(self):
+        return self.entries[0][1] if self.entries else 0
+
+    def is_new_high_score(self, score):
+        return score > self.top_score()
+
+    def qualifies(self, score):
+        return score > 0 and (len(self.entries) < self.size or score > self.entries[-1][1])
+
+    def add(self, initials, score):
+        self.entries.append((initials, score))
+        self.entries.sort(key=lambda entry: entry[1], reverse=True)
+        del self.entries[self.size:]
+        self.save()
+
+    def save(self):
+        # Hand a snapshot to the writer thread so the caller never waits on the disk
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_behind, daemon=True)
+            self._writer.start()
+        self._pending.put(list(self.entries))
+
+    def close(self):
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _write_behind(self):
+        while True:
+            entries = self._pending.get()
+            if entries is None:
+                return
+            # Only the newest snapshot matters if several piled up
+            while not self._pending.empty():
+                newer = self._pending.get()
+                if newer is None:
+                    self._write(entries)
+                    return
+                entries = newer
+            self._write(entries)
+
+    def _write(self, entries):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", newline="") as high_score:
+            csv.writer(high_score).writerows(entries)
+            high_score.flush()
+            os.fsync(high_score.fileno())
+        os.replace(temp_path, self.path)
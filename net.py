@@ -0,0 +1,555 @@
+import argparse
+import asyncio
+import collections
+import gc
+import random
+import struct
+import threading
+import time
+import weakref
+import zlib
+
+import numpy as np
+import pygame
+
+from simulation import Simulation, SpaceShip, INPUT_LEFT, INPUT_RIGHT, TICK_MS, entity_type
+
+NET_PORT = 7777
+
+ROLE_SPECTATOR = 0
+ROLE_PLAYER = 1
+
+# Message types; every message is framed as (payload length, type) followed by the payload
+MSG_HELLO = 1
+MSG_WELCOME = 2
+MSG_SNAPSHOT = 3
+MSG_ACK = 4
+MSG_INPUT = 5
+_FRAME = struct.Struct("<IB")
+MAX_MESSAGE_BYTES = 1 << 20
+
+# Snapshots go out every SNAPSHOT_INTERVAL ticks; the client predicts its own ship in between
+SNAPSHOT_INTERVAL = 2
+# Sent snapshots kept as delta baselines, by both ends
+SNAPSHOT_HISTORY = 128
+NO_SNAPSHOT = 0xFFFFFFFF
+
+# Each client gets at most this many bytes per second on average. A client that falls behind, or whose socket
+# buffer fills up, skips snapshots; the next one is a delta against what it last acknowledged, so nothing breaks.
+MAX_CLIENT_BYTES_PER_S = 48 * 1024
+MAX_CLIENT_BUFFERED_BYTES = 64 * 1024
+MAX_PENDING_EVENTS = 64
+
+# Remote inputs waiting for the game thread; older ones are dropped rather than adding lag. The client predicts
+# from at most half a second of inputs the host hasn't applied.
+MAX_INPUT_BACKLOG = 8
+MAX_PREDICTED_INPUTS = 30
+
+# The capture check plays games of up to CHECK_GAME_TICKS and compares captures every CAPTURE_CHECK_INTERVAL ticks
+CHECK_GAME_TICKS = 3000
+CAPTURE_CHECK_INTERVAL = 30
+
+# Snapshot fields in wire order. Each one is bytes, and unchanged fields are left out of the delta.
+SNAPSHOT_FIELDS = ("game", "player", "player_bullets", "enemy_bullets", "ship", "formation_x", "formation_y",
+                   "formation_state", "walls")
+_GAME = struct.Struct("<QI")
+_PLAYER = struct.Struct("<fhBBIH")
+_SHIP = struct.Struct("<ffBBBHB")
+_WALL = struct.Struct("<ffh")
+_SNAPSHOT = struct.Struct("<III")
+_MASKS = struct.Struct("<HH")
+_WELCOME = struct.Struct("<B")
+_ACK = struct.Struct("<I")
+_INPUT = struct.Struct("<IB")
+
+
+def _bullet_bytes(pool):
+    return np.array([(pool.x[bullet], pool.y[bullet]) for bullet in pool.live], dtype=np.float32).tobytes()
+
+
+class SnapshotCapture:
+    def __init__(self):
+        # Wall bitmaps only change when a crater is carved. The cache holds the wall objects themselves rather
+        # than their ids, so a wall of a later game can never be mistaken for one of an earlier game.
+        self.wall_bits = weakref.WeakKeyDictionary()
+
+    def _wall_bytes(self, wall):
+        version = (wall.health, wall.version)
+        cached = self.wall_bits.get(wall)
+        if cached is None or cached[0] != version:
+            opaque = pygame.surfarray.array_alpha(wall.image) > 0
+            cached = (version, _WALL.pack(wall.x, wall.y, wall.health) + np.packbits(opaque).tobytes())
+            self.wall_bits[wall] = cached
+        return cached[1]
+
+    def capture(self, sim):
+        player = sim.player.sprite
+        formation = sim.enemy_manager
+        ship = sim.spaceship_enemy
+        ship_state = b""
+        if ship is not None:
+            ship_state = _SHIP.pack(ship.x, ship.y, ship.frame, ship.hit, ship.death_animation_counter, ship.points,
+                                    ship.should_move_right)
+        return {
+            "game": _GAME.pack(sim.seed or 0, sim.swarm_size),
+            "player": _PLAYER.pack(player.x, player.lives, player.is_dying, sim.game_over, player.score,
+                                   sim.current_level),
+            "player_bullets": _bullet_bytes(player.bullets),
+            "enemy_bullets": _bullet_bytes(formation.bullets),
+            "ship": ship_state,
+            "formation_x": formation.x.astype(np.float32).tobytes(),
+            "formation_y": formation.y.astype(np.float32).tobytes(),
+            "formation_state": np.stack((formation.alive, formation.hit, formation.kind, formation.frame,
+                                         formation.death_tick)).astype(np.uint8).tobytes(),
+            "walls": b"".join(self._wall_bytes(wall) for wall in sim.walls),
+        }
+
+
+def encode_delta(snapshot, baseline, events):
+    # Changed fields of the same length are XORed against the baseline, so bytes that didn't change become
+    # zeros and the whole body compresses to a fraction of its size
+    changed = xored = 0
+    parts = []
+    for bit, name in enumerate(SNAPSHOT_FIELDS):
+        data = snapshot[name]
+        base = baseline.get(name) if baseline is not None else None
+        if data == base:
+            continue
+        changed |= 1 << bit
+        if base is not None and len(base) == len(data) and data:
+            xored |= 1 << bit
+            data = (np.frombuffer(data, np.uint8) ^ np.frombuffer(base, np.uint8)).tobytes()
+        parts.append(struct.pack("<I", len(data)) + data)
+    event_bytes = "\n".join(events).encode()
+    body = _MASKS.pack(changed, xored) + b"".join(parts) + struct.pack("<H", len(event_bytes)) + event_bytes
+    return zlib.compress(body, 1)
+
+
+def decode_delta(payload, baseline):
+    body = zlib.decompress(payload)
+    changed, xored = _MASKS.unpack_from(body)
+    offset = _MASKS.size
+    snapshot = dict(baseline) if baseline is not None else {}
+    for bit, name in enumerate(SNAPSHOT_FIELDS):
+        if not changed & 1 << bit:
+            continue
+        length, = struct.unpack_from("<I", body, offset)
+        data = body[offset + 4:offset + 4 + length]
+        offset += 4 + length
+        if xored & 1 << bit:
+            data = (np.frombuffer(data, np.uint8) ^ np.frombuffer(snapshot[name], np.uint8)).tobytes()
+        snapshot[name] = data
+    length, = struct.unpack_from("<H", body, offset)
+    events = body[offset + 2:offset + 2 + length].decode()
+    return snapshot, events.split("\n") if events else []
+
+
+def _set_bullets(pool, data):
+    pool.clear()
+    for x, y in np.frombuffer(data, np.float32).reshape(-1, 2).tolist():
+        if not pool.free:
+            break
+        bullet = pool.free.pop()
+        pool.x[bullet], pool.y[bullet], pool.prev_y[bullet] = x, y, y
+        pool.live.append(bullet)
+
+
+def _set_walls(walls, data):
+    wall_type = entity_type("wall")
+    record = _WALL.size + (wall_type.width * wall_type.height + 7) // 8
+    standing = {}
+    for offset in range(0, len(data), record):
+        x, y, health = _WALL.unpack_from(data, offset)
+        standing[(x, y)] = (health, data[offset + _WALL.size:offset + record])
+    for wall in walls.sprites():
+        if (wall.x, wall.y) not in standing:
+            wall.kill()
+            continue
+        health, bits = standing[(wall.x, wall.y)]
+        if wall.health != health:
+            wall.health = health
+            opaque = np.unpackbits(np.frombuffer(bits, np.uint8))[:wall.width * wall.height]
+            wall.image = wall_type.frames[0].copy()
+            alpha = pygame.surfarray.pixels_alpha(wall.image)
+            alpha[opaque.reshape(wall.width, wall.height) == 0] = 0
+            del alpha
+
+
+def apply_snapshot(sim, snapshot):
+    # The client's Simulation is never stepped; it only holds the host's state so draw_game can show it
+    seed, swarm_size = _GAME.unpack(snapshot["game"])
+    if sim is None or sim.seed != seed or sim.swarm_size != swarm_size:
+        sim = Simulation(seed, swarm_size)
+
+    player = sim.player.sprite
+    x, player.lives, is_dying, game_over, player.score, sim.current_level = _PLAYER.unpack(snapshot["player"])
+    player.x = player.prev_x = x
+    player.is_dying, sim.game_over = bool(is_dying), bool(game_over)
+    _set_bullets(player.bullets, snapshot["player_bullets"])
+    _set_bullets(sim.enemy_manager.bullets, snapshot["enemy_bullets"])
+
+    if not snapshot["ship"]:
+        sim.spaceship_enemy = None
+    else:
+        x, y, frame, hit, counter, points, should_move_right = _SHIP.unpack(snapshot["ship"])
+        if sim.spaceship_enemy is None:
+            sim.spaceship_enemy = SpaceShip(bool(should_move_right), random.Random(seed))
+        ship = sim.spaceship_enemy
+        ship.x = ship.prev_x = x
+        ship.y = ship.prev_y = y
+        ship.frame, ship.hit, ship.death_animation_counter, ship.points = frame, bool(hit), counter, points
+
+    formation = sim.enemy_manager
+    x = np.frombuffer(snapshot["formation_x"], np.float32).astype(float)
+    y = np.frombuffer(snapshot["formation_y"], np.float32).astype(float)
+    alive, hit, kind, frame, death_tick = np.frombuffer(snapshot["formation_state"], np.uint8).reshape(5, -1)
+    if len(kind) != len(formation.kind) or (kind != formation.kind).any():
+        formation.reset(x, y, kind)
+    formation.x, formation.y = x, y
+    formation.alive, formation.hit = alive.astype(bool), hit.astype(bool)
+    formation.frame, formation.death_tick = frame.astype(np.int8), death_tick.astype(np.int8)
+
+    _set_walls(sim.walls, snapshot["walls"])
+    return sim
+
+
+async def _read_message(reader):
+    length, kind = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if length > MAX_MESSAGE_BYTES:
+        raise ConnectionError(f"message of {length} bytes is over the {MAX_MESSAGE_BYTES} byte limit")
+    return kind, await reader.readexactly(length)
+
+
+def _write_message(writer, kind, payload=b""):
+    writer.write(_FRAME.pack(len(payload), kind) + payload)
+
+
+class _Client:
+    def __init__(self, writer, role):
+        self.writer = writer
+        self.role = role
+        self.acked = NO_SNAPSHOT
+        self.tokens = MAX_CLIENT_BYTES_PER_S
+        self.last_refill = None
+        self.pending_events = []
+        self.inputs = collections.deque(maxlen=MAX_INPUT_BACKLOG)
+        self.input_ack = 0
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+        self.snapshots_skipped = 0
+
+
+class NetHost:
+    def __init__(self, host="127.0.0.1", port=NET_PORT):
+        self.address = (host, port)
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+        self.clients = []
+        self.connections = set()
+        self.player = None
+        self.capture = SnapshotCapture()
+        self.history = collections.OrderedDict()
+        self.sequence = 0
+        self.ticks = 0
+        self.events = []
+
+    def start(self):
+        # The sockets live on an asyncio loop in their own thread; the game thread only hands it snapshots
+        self.thread = threading.Thread(target=self._run, name="net-host", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._serve, *self.address))
+        except OSError as error:
+            self.error = error
+            self.ready.set()
+            return
+        self.address = self.server.sockets[0].getsockname()[:2]
+        self.ready.set()
+        self.loop.run_forever()
+        self.server.close()
+        # From Python 3.12 wait_closed() also waits for every open connection, so those are closed first. Each
+        # one's _serve then reads the end of the stream and finishes before the loop is closed under it.
+        for writer in self.connections:
+            writer.close()
+        self.loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(self.loop)))
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def close(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    async def _serve(self, reader, writer):
+        client = None
+        self.connections.add(writer)
+        try:
+            kind, payload = await _read_message(reader)
+            if kind != MSG_HELLO:
+                return
+            role = ROLE_PLAYER if payload[:1] == bytes((ROLE_PLAYER,)) and self.player is None else ROLE_SPECTATOR
+            client = _Client(writer, role)
+            if role == ROLE_PLAYER:
+                self.player = client
+            _write_message(writer, MSG_WELCOME, _WELCOME.pack(role))
+            self.clients = self.clients + [client]
+            while True:
+                kind, payload = await _read_message(reader)
+                if kind == MSG_ACK:
+                    client.acked, = _ACK.unpack(payload)
+                elif kind == MSG_INPUT and client.role == ROLE_PLAYER:
+                    client.inputs.append(_INPUT.unpack(payload))
+        except (ConnectionError, asyncio.IncompleteReadError, struct.error):
+            pass
+        finally:
+            if client is not None:
+                self.clients = [other for other in self.clients if other is not client]
+                if self.player is client:
+                    self.player = None
+            self.connections.discard(writer)
+            writer.close()
+
+    def take_inputs(self):
+        # One remote input per tick, called from the game thread
+        player = self.player
+        if player is None or not player.inputs:
+            return 0
+        sequence, inputs = player.inputs.popleft()
+        player.input_ack = sequence
+        return inputs
+
+    def start_game(self):
+        # Called from the game thread when a game starts, so events left over from the last one aren't replayed
+        self.ticks = 0
+        self.events = []
+
+    def publish(self, sim, events):
+        # Called from the game thread after every tick; it never touches a socket. The tick that ends the game is
+        # always sent, since no further ticks follow to carry its state and events.
+        if not self.clients:
+            return
+        self.events.extend(events)
+        self.ticks += 1
+        if self.ticks % SNAPSHOT_INTERVAL and not sim.game_over:
+            return
+        snapshot = self.capture.capture(sim)
+        events, self.events = self.events, []
+        self.loop.call_soon_threadsafe(self._broadcast, snapshot, events)
+
+    def _broadcast(self, snapshot, events):
+        self.sequence += 1
+        self.history[self.sequence] = snapshot
+        while len(self.history) > SNAPSHOT_HISTORY:
+            self.history.popitem(last=False)
+        now = self.loop.time()
+        for client in self.clients:
+            client.pending_events = (client.pending_events + events)[-MAX_PENDING_EVENTS:]
+            if client.last_refill is not None:
+                client.tokens = min(MAX_CLIENT_BYTES_PER_S,
+                                    client.tokens + (now - client.last_refill) * MAX_CLIENT_BYTES_PER_S)
+            client.last_refill = now
+            if client.tokens <= 0 or client.writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFERED_BYTES:
+                client.snapshots_skipped += 1
+                continue
+            baseline = self.history.get(client.acked)
+            payload = (_SNAPSHOT.pack(self.sequence, client.acked if baseline is not None else NO_SNAPSHOT,
+                                      client.input_ack)
+                       + encode_delta(snapshot, baseline, client.pending_events))
+            _write_message(client.writer, MSG_SNAPSHOT, payload)
+            client.pending_events = []
+            client.tokens -= len(payload) + _FRAME.size
+            client.bytes_sent += len(payload) + _FRAME.size
+            client.snapshots_sent += 1
+
+
+class NetClient:
+    def __init__(self, host="127.0.0.1", port=NET_PORT, role=ROLE_SPECTATOR):
+        self.address = (host, port)
+        self.requested_role = role
+        self.role = None
+        self.loop = None
+        self.thread = None
+        self.writer = None
+        self.connected = threading.Event()
+        self.closed = False
+        self.error = None
+        self.history = collections.OrderedDict()
+        self.latest = None
+        self.events = collections.deque(maxlen=MAX_PENDING_EVENTS)
+        self.input_sequence = 0
+        self.predicted = collections.deque(maxlen=MAX_PREDICTED_INPUTS)
+        self.bytes_received = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="net-client", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._receive())
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, zlib.error, struct.error) as error:
+            self.error = error
+        finally:
+            self.closed = True
+            self.connected.set()
+            self.loop.close()
+
+    async def _receive(self):
+        reader, self.writer = await asyncio.open_connection(*self.address)
+        _write_message(self.writer, MSG_HELLO, bytes((self.requested_role,)))
+        kind, payload = await _read_message(reader)
+        if kind != MSG_WELCOME:
+            raise ConnectionError("host did not answer with a welcome")
+        self.role, = _WELCOME.unpack(payload)
+        self.connected.set()
+        while True:
+            kind, payload = await _read_message(reader)
+            if kind != MSG_SNAPSHOT:
+                continue
+            self.bytes_received += len(payload) + _FRAME.size
+            sequence, baseline, input_ack = _SNAPSHOT.unpack_from(payload)
+            if baseline != NO_SNAPSHOT and baseline not in self.history:
+                # The baseline was dropped here; asking with no ack makes the host send a full snapshot
+                _write_message(self.writer, MSG_ACK, _ACK.pack(NO_SNAPSHOT))
+                continue
+            snapshot, events = decode_delta(payload[_SNAPSHOT.size:], self.history.get(baseline))
+            self.history[sequence] = snapshot
+            while len(self.history) > SNAPSHOT_HISTORY:
+                self.history.popitem(last=False)
+            self.events.extend(events)
+            self.latest = (sequence, snapshot, input_ack)
+            _write_message(self.writer, MSG_ACK, _ACK.pack(sequence))
+
+    def close(self):
+        if self.writer is not None and not self.closed:
+            self._call_soon(self.writer.close)
+        if self.thread is not None:
+            self.thread.join(1)
+
+    def send_input(self, inputs):
+        # Called from the game thread once per tick; the input is also kept until the host has applied it
+        self.input_sequence += 1
+        self.predicted.append((self.input_sequence, inputs))
+        if self.writer is not None and not self.closed:
+            self._call_soon(_write_message, self.writer, MSG_INPUT, _INPUT.pack(self.input_sequence, inputs))
+
+    def _call_soon(self, callback, *args):
+        # The network thread can close the loop between the caller's check and this call; by then the
+        # connection is gone, so there is nothing left to send
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass
+
+    def take_events(self):
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events
+
+    def predict(self, sim, input_ack, host_x):
+        # Replays the inputs the host hasn't applied yet on top of its ship position, so the local player's
+        # ship answers immediately instead of a round trip later. Only movement is predicted; shots come
+        # from the host.
+        while self.predicted and self.predicted[0][0] <= input_ack:
+            self.predicted.popleft()
+        player = sim.player.sprite
+        player.x = host_x
+        if player.is_dying or sim.game_over:
+            return
+        for sequence, inputs in self.predicted:
+            player.apply_inputs(inputs & (INPUT_LEFT | INPUT_RIGHT), [])
+        player.prev_x = player.x
+
+
+def check_captures(games, seed, swarm_size, ticks=CHECK_GAME_TICKS):
+    # One capture serves game after game, as it does on a host left running. Each game is freed before the next
+    # starts, so new walls can reuse the memory of old ones, which is what a cache keyed on ids got wrong.
+    from bots import scripted_bot
+
+    capture = SnapshotCapture()
+    matched = checks = 0
+    for game in range(games):
+        sim = None
+        gc.collect()
+        sim = Simulation(seed + game, swarm_size)
+        for tick in range(ticks):
+            if sim.game_over:
+                break
+            sim.step(scripted_bot(sim))
+            if tick % CAPTURE_CHECK_INTERVAL == 0:
+                checks += 1
+                matched += capture.capture(sim) == SnapshotCapture().capture(sim)
+    return matched, checks
+
+
+def main():
+    # The loopback check never opens a window or an audio device. This is set here rather than on import because
+    # main.py imports this module for the windowed game.
+    from bots import scripted_bot
+    from headless import swarm_size, use_dummy_drivers
+    use_dummy_drivers()
+
+    parser = argparse.ArgumentParser(description="Host a bot game over loopback and measure what clients receive.")
+    parser.add_argument("--spectators", type=int, default=3, help="spectator clients besides the second player")
+    parser.add_argument("--seconds", type=float, default=10, help="how long to play")
+    parser.add_argument("--check-games", type=int, default=0,
+                        help="bot games to play first, checking the host's cached captures against fresh ones")
+    parser.add_argument("--seed", type=int, default=0, help="game seed")
+    parser.add_argument("--swarm", type=swarm_size, default=50, help="invaders per wave")
+    parser.add_argument("--fast", action="store_true", help="step as fast as possible instead of at 60 ticks/s")
+    args = parser.parse_args()
+
+    if args.check_games:
+        matched, checks = check_captures(args.check_games, args.seed, args.swarm)
+        print(f"{matched}/{checks} cached captures over {args.check_games} games matched a fresh capture")
+
+    host = NetHost("127.0.0.1", 0)
+    host.start()
+    clients = [NetClient(*host.address, ROLE_PLAYER)]
+    clients += [NetClient(*host.address, ROLE_SPECTATOR) for _ in range(args.spectators)]
+    for client in clients:
+        client.start()
+        client.connected.wait()
+    while len(host.clients) < len(clients):
+        time.sleep(0.01)
+
+    sim = Simulation(args.seed, args.swarm)
+    full = len(encode_delta(host.capture.capture(sim), None, []))
+    start = time.perf_counter()
+    ticks = 0
+    while time.perf_counter() - start < args.seconds and not sim.game_over:
+        # The second player sends the bot's moves; the host applies them as they arrive
+        clients[0].send_input(scripted_bot(sim))
+        host.publish(sim, sim.step(host.take_inputs()))
+        ticks += 1
+        if not args.fast:
+            time.sleep(max(0.0, start + ticks * TICK_MS / 1000 - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+
+    print(f"{ticks} ticks in {elapsed:.1f}s, score {sim.player.sprite.score}; a full snapshot is {full} bytes")
+    for index, (client, stats) in enumerate(zip(clients, host.clients)):
+        sequence, snapshot, input_ack = client.latest
+        in_sync = snapshot == host.history.get(sequence)
+        role = "player" if client.role == ROLE_PLAYER else "spectator"
+        print(f"client {index} ({role}): {stats.snapshots_sent} snapshots, {stats.snapshots_skipped} skipped, "
+              f"{stats.bytes_sent / max(stats.snapshots_sent, 1):.0f} bytes each, "
+              f"{client.bytes_received / elapsed / 1024:.1f} KiB/s, {'in sync' if in_sync else 'OUT OF SYNC'}")
+    for client in clients:
+        client.close()
+    host.close()
+
+
+if __name__ == '__main__':
+    main()
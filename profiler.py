@@ -0,0 +1,155 @@
+import csv
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+# Frames kept for percentiles and export
+PROFILE_HISTORY = 600
+PROFILE_TRACE_FILE = "profile_trace.csv"
+PERCENTILES = (50, 95, 99)
+
+# The overlay text is only re-rendered this often so it barely shows up in its own numbers
+OVERLAY_REFRESH_FRAMES = 15
+OVERLAY_POSITION = (10, 60)
+OVERLAY_BACKGROUND = (0, 0, 0, 180)
+OVERLAY_COLOR = (255, 255, 0)
+
+
+class _Scope:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        if self.profiler.recording:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        profiler = self.profiler
+        if profiler.recording:
+            profiler.timings[self.name] = profiler.timings.get(self.name, 0) + time.perf_counter() - self.start
+
+
+class Profiler:
+    def __init__(self, history=PROFILE_HISTORY):
+        self.enabled = False
+        self.recording = False
+        self.frames = deque(maxlen=history)
+        self.frame_count = 0
+        self.frame_start = 0
+        self.blocks_start = 0
+        self.timings = {}
+        self.counters = {}
+        self.scopes = {}
+
+        self.font = None
+        self.overlay = None
+        self.overlay_age = 0
+
+    def start(self, history=PROFILE_HISTORY):
+        self.frames = deque(maxlen=history)
+        self.frame_count = 0
+        self.enabled = True
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.overlay = None
+
+    def scope(self, name):
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = _Scope(self, name)
+        return scope
+
+    def count(self, name, amount=1):
+        if self.recording:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def begin_frame(self):
+        # Toggling only takes effect on a frame boundary so scopes never see half a frame
+        self.recording = self.enabled
+        if self.recording:
+            self.timings = {}
+            self.counters = {}
+            self.blocks_start = sys.getallocatedblocks()
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.recording:
+            return
+        self.recording = False
+        frame = {"frame": self.frame_count, "frame_ms": (time.perf_counter() - self.frame_start) * 1000}
+        for name, seconds in self.timings.items():
+            frame[f"{name}_ms"] = seconds * 1000
+        frame.update(self.counters)
+        frame["allocated_blocks"] = sys.getallocatedblocks() - self.blocks_start
+        self.frames.append(frame)
+        self.frame_count += 1
+
+    def next_frame(self):
+        self.end_frame()
+        self.begin_frame()
+
+    def keys(self):
+        keys = {}
+        for frame in self.frames:
+            keys.update(dict.fromkeys(frame))
+        return list(keys)
+
+    def percentiles(self, key="frame_ms"):
+        values = [frame.get(key, 0) for frame in self.frames]
+        if not values:
+            return {}
+        return dict(zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist()))
+
+    def export(self, path=PROFILE_TRACE_FILE):
+        frames = list(self.frames)
+        keys = self.keys()
+        if path.endswith(".json"):
+            summary = {key: self.percentiles(key) for key in keys if key.endswith("_ms")}
+            with open(path, "w") as trace:
+                json.dump({"percentiles": summary, "frames": frames}, trace, indent=1)
+        else:
+            with open(path, "w", newline="") as trace:
+                writer = csv.DictWriter(trace, fieldnames=keys, restval=0)
+                writer.writeheader()
+                writer.writerows(frames)
+        return path
+
+    def _overlay_lines(self):
+        frame_times = self.percentiles()
+        lines = ["frame  p50 {:.2f}  p95 {:.2f}  p99 {:.2f} ms".format(*frame_times.values())]
+        latest = self.frames[-1]
+        for key in latest:
+            if key.endswith("_ms") and key != "frame_ms":
+                scope_times = self.percentiles(key)
+                lines.append(f"{key[:-3]}  p50 {scope_times[50]:.2f}  p95 {scope_times[95]:.2f} ms")
+        for key, value in latest.items():
+            if key != "frame" and not key.endswith("_ms"):
+                lines.append(f"{key}  {value}")
+        return lines
+
+    def draw_overlay(self, screen):
+        if not self.enabled or not self.frames:
+            return
+        self.overlay_age += 1
+        if self.overlay is None or self.overlay_age >= OVERLAY_REFRESH_FRAMES:
+            if self.font is None:
+                self.font = pygame.font.Font(None, 20)
+            labels = [self.font.render(line, True, OVERLAY_COLOR) for line in self._overlay_lines()]
+            line_height = self.font.get_linesize()
+            self.overlay = pygame.Surface((max(label.get_width() for label in labels) + 10,
+                                           line_height * len(labels) + 10), pygame.SRCALPHA)
+            self.overlay.fill(OVERLAY_BACKGROUND)
+            for index, label in enumerate(labels):
+                self.overlay.blit(label, (5, 5 + index * line_height))
+            self.overlay_age = 0
+        screen.blit(self.overlay, OVERLAY_POSITION)
+
+
+profiler = Profiler()
@@ -0,0 +1,213 @@
+import collections
+import math
+
+import pygame
+from profiler import profiler
+
+# Past this share of the screen, one full update is cheaper than a long list of small ones
+FULL_UPDATE_RATIO = 0.5
+
+
+def merge_rects(rects, bounds):
+    # Overlapping rects are joined, so no pixel is cleared or drawn twice; blending a sprite twice over itself
+    # would darken its soft edges
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if not rect.w or not rect.h:
+            continue
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class DirtyRenderer:
+    def __init__(self, surface, dirty_rects=True):
+        self.surface = surface
+        self.dirty_rects = dirty_rects
+        self.screen_area = surface.get_width() * surface.get_height()
+
+        self.background = None
+        self.ops = []
+        self.previous_background = None
+        self.previous_keys = []
+        self.previous_rects = []
+        self.full_redraw = True
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def resize(self):
+        self.invalidate()
+
+    def begin(self, background):
+        self.background = background
+        self.ops = []
+
+    def blit(self, surface, dest, version=None):
+        # A surface that is drawn on in place passes a version that changes with its pixels
+        self.ops.append((surface, dest) if version is None else (surface, dest, version))
+
+    def blits(self, sequence):
+        self.ops.extend(sequence)
+
+    def line(self, color, start, end, width=1):
+        self.ops.append((color, start, end, width))
+
+    def _op_rect(self, op):
+        # Where an op lands, worked out without drawing it; blit truncates float positions the same way Rect does
+        if len(op) == 4:
+            color, start, end, width = op
+            rect = pygame.Rect(min(start[0], end[0]), min(start[1], end[1]),
+                               abs(end[0] - start[0]) + 1, abs(end[1] - start[1]) + 1)
+            return rect.inflate(width + 1, width + 1)
+        surface, dest = op[0], op[1]
+        return pygame.Rect(dest[0], dest[1], *surface.get_size())
+
+    def _op_key(self, op, rect):
+        # Two ops with the same key put the same pixels in the same place
+        if len(op) == 4:
+            color, start, end, width = op
+            return tuple(color), tuple(start), tuple(end), width
+        return op[0], rect.x, rect.y, op[2] if len(op) == 3 else None
+
+    def _draw(self, op):
+        if len(op) == 4:
+            pygame.draw.line(self.surface, *op)
+        else:
+            self.surface.blit(op[0], op[1])
+
+    def _draw_ops(self):
+        for op in self.ops:
+            self._draw(op)
+        profiler.count("blits", len(self.ops))
+
+    def _update(self, rects=None):
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def present(self):
+        if not self.dirty_rects:
+            self.surface.fill(self.background)
+            self._draw_ops()
+            self._update()
+            return
+
+        rects = [self._op_rect(op) for op in self.ops]
+        keys = [self._op_key(op, rect) for op, rect in zip(self.ops, rects)]
+        full = self.full_redraw or self.background != self.previous_background
+        if not full:
+            # Ops that drew the same pixels last frame are still on screen. What has to change is the area of
+            # the ops that appeared and of the ones that went away, whether they moved, changed or left.
+            unchanged = collections.Counter(keys) & collections.Counter(self.previous_keys)
+            kept = unchanged.copy()
+            damage = []
+            for key, rect in zip(self.previous_keys, self.previous_rects):
+                if kept[key]:
+                    kept[key] -= 1
+                else:
+                    damage.append(rect)
+            added = []
+            for key, rect in zip(keys, rects):
+                if unchanged[key]:
+                    unchanged[key] -= 1
+                    added.append(False)
+                else:
+                    damage.append(rect)
+                    added.append(True)
+            damage = merge_rects(damage, self.surface.get_rect())
+            if not damage:
+                return
+            # Clearing hundreds of small rects one at a time costs more than one fill of the whole surface
+            full = sum(rect.w * rect.h for rect in damage) > self.screen_area * FULL_UPDATE_RATIO
+
+        if full:
+            self.surface.fill(self.background)
+            self._draw_ops()
+            self._update()
+        else:
+            for rect in damage:
+                self.surface.fill(self.background, rect)
+            # Everything under the damage is drawn again in order, so ops stay layered as before. New ops are
+            # inside the damage already; unchanged ops only draw the part inside it, and the rest of the screen
+            # is left alone.
+            drawn = 0
+            for op, rect, new in zip(self.ops, rects, added):
+                if new:
+                    self._draw(op)
+                    drawn += 1
+                    continue
+                overlaps = rect.collidelistall(damage)
+                for index in overlaps:
+                    self.surface.set_clip(damage[index])
+                    self._draw(op)
+                if overlaps:
+                    self.surface.set_clip(None)
+                    drawn += len(overlaps)
+            profiler.count("blits", drawn)
+            self._update(damage)
+            profiler.count("dirty_rects", len(damage))
+
+        self.full_redraw = False
+        self.previous_background = self.background
+        self.previous_keys = keys
+        self.previous_rects = rects
+
+
+class ScaledRenderer(DirtyRenderer):
+    def __init__(self, window, size, smooth=False, dirty_rects=True):
+        # Everything is drawn at the logical size and scaled to the window once per frame, so sprites are
+        # only ever scaled once, when they are loaded
+        super().__init__(pygame.Surface(size).convert(window), dirty_rects)
+        self.window = window
+        self.smooth = smooth
+        self.resize()
+
+    def resize(self):
+        window_width, window_height = self.window.get_size()
+        width, height = self.surface.get_size()
+        scale = min(window_width / width, window_height / height)
+        # Integer scaling keeps every logical pixel the same square block; smooth scaling fills the window
+        self.scale = scale if self.smooth or scale < 1 else int(scale)
+        self.viewport = pygame.Rect(0, 0, round(width * self.scale), round(height * self.scale))
+        self.viewport.center = (window_width // 2, window_height // 2)
+        self.view = self.window.subsurface(self.viewport)
+        self.window.fill((0, 0, 0))
+        self.invalidate()
+
+    def _window_rect(self, rect):
+        left, top = math.floor(rect.left * self.scale), math.floor(rect.top * self.scale)
+        right = min(math.ceil(rect.right * self.scale), self.viewport.width)
+        bottom = min(math.ceil(rect.bottom * self.scale), self.viewport.height)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def _update(self, rects=None):
+        # The smooth filter's sample positions depend on the size of the whole image, so scaling only the changed
+        # areas would leave seams. Smooth output is always scaled in one pass.
+        if rects is None or self.smooth:
+            if self.smooth:
+                pygame.transform.smoothscale(self.surface, self.viewport.size, self.view)
+            else:
+                pygame.transform.scale(self.surface, self.viewport.size, self.view)
+            pygame.display.update(self.viewport)
+            return
+        window_rects = []
+        for rect in rects:
+            rect = rect.clip(self.surface.get_rect())
+            if rect.w and rect.h:
+                window_rect = self._window_rect(rect)
+                pygame.transform.scale(self.surface.subsurface(rect), window_rect.size,
+                                       self.view.subsurface(window_rect))
+                window_rects.append(window_rect.move(self.viewport.topleft))
+        pygame.display.update(window_rects)
+
+
+class SurfaceRenderer(DirtyRenderer):
+    # Draws into a surface that is never shown on screen, such as an observation buffer
+    def _update(self, rects=None):
+        pass
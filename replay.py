@@ -0,0 +1,102 @@
+import argparse
+import random
+import struct
+import sys
+import time
+
+from simulation import Simulation
+
+REPLAY_MAGIC = b"SIRP"
+REPLAY_VERSION = 1
+
+# Header: magic, version, seed, swarm size, tick count, final score
+_HEADER = struct.Struct("<4sBQIII")
+# Inputs rarely change from one tick to the next, so they are stored as (input bits, run length) pairs
+_RUN = struct.Struct("<BH")
+MAX_RUN = 0xFFFF
+
+
+def new_seed():
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+class Replay:
+    def __init__(self, seed, swarm_size=50, inputs=b"", score=0):
+        self.seed = seed
+        self.swarm_size = swarm_size
+        self.inputs = bytearray(inputs)
+        self.score = score
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def create_simulation(self):
+        return Simulation(self.seed, self.swarm_size)
+
+    def record(self, inputs):
+        self.inputs.append(inputs)
+
+    def save(self, path):
+        runs = bytearray()
+        index = 0
+        while index < len(self.inputs):
+            value = self.inputs[index]
+            end = index + 1
+            while end < len(self.inputs) and self.inputs[end] == value and end - index < MAX_RUN:
+                end += 1
+            runs += _RUN.pack(value, end - index)
+            index = end
+
+        with open(path, "wb") as replay_file:
+            replay_file.write(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.swarm_size,
+                                           len(self.inputs), self.score))
+            replay_file.write(runs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            data = replay_file.read()
+        magic, version, seed, swarm_size, ticks, score = _HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay")
+
+        inputs = bytearray()
+        for value, length in _RUN.iter_unpack(data[_HEADER.size:]):
+            inputs += bytes((value,)) * length
+        if len(inputs) != ticks:
+            raise ValueError(f"{path} is truncated: expected {ticks} ticks, found {len(inputs)}")
+        return cls(seed, swarm_size, inputs, score)
+
+
+def play_replay(replay):
+    sim = replay.create_simulation()
+    for inputs in replay.inputs:
+        sim.step(inputs)
+    return sim
+
+
+def main():
+    # Playback from the command line never opens a window or an audio device. This is set here rather than on
+    # import because main.py imports this module for the windowed game.
+    from headless import use_dummy_drivers
+    use_dummy_drivers()
+
+    parser = argparse.ArgumentParser(description="Re-simulate a recorded game without a display.")
+    parser.add_argument("replay", help="replay file written by main.py --record")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    start = time.perf_counter()
+    sim = play_replay(replay)
+    elapsed = time.perf_counter() - start
+
+    score = sim.player.sprite.score
+    print(f"seed {replay.seed}: score {score}, level {sim.current_level}, ticks {sim.ticks} "
+          f"in {elapsed:.2f}s ({sim.ticks / elapsed:.0f} ticks/s)")
+    if score != replay.score:
+        print(f"replay diverged: recorded score {replay.score}, replayed score {score}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import pygame
+from profiler import profiler, PROFILE_TRACE_FILE
+
+
+class Scene:
+    fps = 30
+
+    def __init__(self):
+        self.manager = None
+
+    def enter(self):
+        pass
+
+    def exit(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def is_idle(self):
+        return False
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        pass
+
+    def draw(self, screen):
+        pass
+
+
+class SceneManager:
+    def __init__(self, renderer, clock, on_first_frame=None, capture=None):
+        self.renderer = renderer
+        self.clock = clock
+        self.stack = []
+        self.on_first_frame = on_first_frame
+        self.capture = capture
+
+    @property
+    def scene(self):
+        return self.stack[-1] if self.stack else None
+
+    def _enter(self, scene):
+        scene.manager = self
+        self.stack.append(scene)
+        scene.enter()
+        self.renderer.invalidate()
+
+    def _exit(self):
+        scene = self.stack.pop()
+        scene.exit()
+        scene.manager = None
+
+    def push(self, scene):
+        if self.stack:
+            self.stack[-1].pause()
+        self._enter(scene)
+
+    def pop(self):
+        self._exit()
+        if self.stack:
+            self.stack[-1].resume()
+            self.renderer.invalidate()
+
+    def replace(self, scene):
+        self._exit()
+        self._enter(scene)
+
+    def clear(self):
+        while self.stack:
+            self._exit()
+
+    def run(self):
+        dt = 0
+        while self.stack:
+            profiler.next_frame()
+            scene = self.stack[-1]
+            with profiler.scope("update"):
+                scene.update(dt)
+            if scene is not self.scene:
+                dt = 0
+                continue
+
+            with profiler.scope("draw"):
+                scene.draw(self.renderer)
+                profiler.draw_overlay(self.renderer)
+            with profiler.scope("present"):
+                self.renderer.present()
+            if self.capture is not None:
+                with profiler.scope("capture"):
+                    self.capture.grab(self.renderer.surface)
+            if self.on_first_frame is not None:
+                self.on_first_frame()
+                self.on_first_frame = None
+
+            # An idle scene has nothing left to animate, so block until there is input instead of polling,
+            # unless the profiler overlay is up or a capture needs frames at a steady rate. A capture is played
+            # back at one rate, so every scene is ticked at that rate while recording.
+            with profiler.scope("wait"):
+                if self.capture is not None:
+                    dt = self.clock.tick(self.capture.fps)
+                    events = pygame.event.get()
+                elif scene.is_idle() and not profiler.enabled:
+                    events = [pygame.event.wait()] + pygame.event.get()
+                    self.clock.tick()
+                    dt = 0
+                else:
+                    dt = self.clock.tick(scene.fps)
+                    events = pygame.event.get()
+
+            for event in events:
+                if event.type == pygame.QUIT:
+                    profiler.end_frame()
+                    self.clear()
+                    return
+                if event.type == pygame.WINDOWEXPOSED:
+                    self.renderer.invalidate()
+                if event.type == pygame.WINDOWSIZECHANGED:
+                    self.renderer.resize()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                    self.renderer.invalidate()
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    profiler.export(PROFILE_TRACE_FILE)
+                    continue
+                scene.handle_event(event)
+                if scene is not self.scene:
+                    dt = 0
+                    break
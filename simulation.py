@@ -0,0 +1,727 @@
+import random
+
+import numpy as np
+import pygame
+
+from assets import ANIMATIONS, get_frames, get_masks, PLAYER_SIZE, WALL_SIZE
+from collision import rect_overlaps, SpatialGrid
+from profiler import profiler
+
+# Playfield
+WIDTH, HEIGHT = 900, 500
+SCREEN_MARGIN = 40
+
+# Simulation runs at a fixed rate, independent of how often frames are drawn
+SIM_HZ = 60
+TICK_MS = 1000 / SIM_HZ
+
+# Other Constants
+SPACESHIP_SPAWN_ODDS = 400
+ENEMY_START_Y = 75
+WALL_HEALTH = 30
+
+# Balance knobs and their stock values. Timings are in ms and odds are "one chance in N".
+DEFAULT_DIFFICULTY = {
+    "spaceship_spawn_odds": SPACESHIP_SPAWN_ODDS,
+    "base_movement_ratio": 1000,
+    "level_speedup": 85,
+    "drop_speedup": 85,
+    "min_movement_ratio": 50,
+    "enemy_shoot_rate": 100,
+    "enemy_shoot_decay": 0.98,
+    "enemy_fire_odds": 11,
+    "enemy_start_y": ENEMY_START_Y,
+    "enemy_start_y_step": 25,
+    "enemy_start_y_levels": 6,
+    "wall_health": WALL_HEALTH,
+    "player_bullet_limit": 1,
+    "player_fire_cooldown": 50,
+    "enemy_bullet_limit": 1,
+}
+# The type and smallest value each knob accepts. Odds, counts and limits are whole numbers; a float knob also
+# takes an int.
+DIFFICULTY_RANGES = {
+    "spaceship_spawn_odds": (int, 1),
+    "base_movement_ratio": (float, 1),
+    "level_speedup": (float, 0),
+    "drop_speedup": (float, 0),
+    "min_movement_ratio": (float, 1),
+    "enemy_shoot_rate": (float, 1),
+    "enemy_shoot_decay": (float, 0),
+    "enemy_fire_odds": (int, 1),
+    "enemy_start_y": (float, 0),
+    "enemy_start_y_step": (float, 0),
+    "enemy_start_y_levels": (int, 0),
+    "wall_health": (int, 1),
+    "player_bullet_limit": (int, 1),
+    "player_fire_cooldown": (float, 0),
+    "enemy_bullet_limit": (int, 0),
+}
+
+# Crater radii carved out of walls by a bullet and by an invader crashing into them
+BULLET_CRATER_RADIUS = 6
+CRASH_CRATER_RADIUS = 14
+
+# How many enemy bullets fit in the pool; how many each shooter may have in flight is a difficulty knob
+ENEMY_BULLET_CAPACITY = 256
+
+# Input bits passed to Simulation.step()
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_FIRE = 4
+
+
+# Per-type data shared by every entity of a type: (animation, points, sound event when destroyed).
+# A spaceship's points are drawn from its tuple when it appears.
+ENTITY_TYPES = {
+    "enemy1": ("enemy1", 10, "enemy_dead"),
+    "enemy2": ("enemy2", 25, "enemy_dead"),
+    "enemy3": ("enemy3", 50, "enemy_dead"),
+    "spaceship": ("spaceship", (10, 25, 50, 100, 250), "spaceship_dead"),
+    "wall": ("wall", 0, None),
+    "player_bullet": ("player_bullet", 0, None),
+    "enemy_bullet": ("enemy_bullet", 0, None),
+}
+
+
+class EntityType:
+    __slots__ = ("name", "width", "height", "frames", "masks", "points", "death_event")
+
+    def __init__(self, name, animation, points, death_event):
+        self.name = name
+        self.width, self.height = ANIMATIONS[animation][0]
+        self.frames = get_frames(animation)
+        self.masks = get_masks(animation)
+        self.points = points
+        self.death_event = death_event
+
+
+_entity_types = {}
+
+
+def entity_type(name):
+    # Built on first use rather than at import, since sprites may still be loading when this module is imported
+    if name not in _entity_types:
+        _entity_types[name] = EntityType(name, *ENTITY_TYPES[name])
+    return _entity_types[name]
+
+
+class Difficulty:
+    def __init__(self, **knobs):
+        unknown = set(knobs) - set(DEFAULT_DIFFICULTY)
+        if unknown:
+            raise ValueError(f"unknown difficulty knobs: {', '.join(sorted(unknown))}")
+        for name, value in knobs.items():
+            kind, minimum = DIFFICULTY_RANGES[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float) if kind is float else int):
+                raise ValueError(f"{name} must be {'a number' if kind is float else 'a whole number'}, not {value!r}")
+            if value < minimum:
+                raise ValueError(f"{name} must be at least {minimum}, not {value}")
+        self.knobs = {**DEFAULT_DIFFICULTY, **knobs}
+        for name, value in self.knobs.items():
+            setattr(self, name, value)
+
+
+class Player(pygame.sprite.Sprite):
+    def __init__(self, bullet_limit=1, fire_cooldown=0):
+        super().__init__()
+        self.width, self.height = PLAYER_SIZE
+        self.image = get_frames("player")[0]
+        self.death_image = get_frames("player-death")[0]
+
+        self.x, self.y = WIDTH / 2 - self.width / 2, HEIGHT - self.height
+        self.prev_x, self.prev_y = self.x, self.y
+        self.rect = self.image.get_rect(topleft=(self.x, self.y))
+        self.mask = get_masks("player")[0]
+
+        self.vel = 5
+
+        # Up to bullet_limit shots in flight, at least fire_cooldown ticks apart so holding fire with a higher
+        # limit gives separate shots rather than one long one
+        self.bullets = BulletPool("player_bullet", bullet_limit, -10)
+        self.bullet_limit = bullet_limit
+        self.fire_cooldown = fire_cooldown
+        self.fire_cooldown_in = 0
+
+        self.score = 0
+
+        self.lives = 3
+        self.is_dying = False
+        self.death_animation_cooldown = 0
+        self.death_sound_played = False
+
+    def apply_inputs(self, inputs, events):
+        if self.fire_cooldown_in > 0:
+            self.fire_cooldown_in -= 1
+        if inputs & INPUT_LEFT and self.x > SCREEN_MARGIN:
+            self.x -= self.vel
+        if inputs & INPUT_RIGHT and self.x < WIDTH - SCREEN_MARGIN - self.width:
+            self.x += self.vel
+        if inputs & INPUT_FIRE:
+            self.shoot(events)
+
+    def shoot(self, events):
+        if len(self.bullets) < self.bullet_limit and self.fire_cooldown_in <= 0:
+            self.bullets.fire(self.x + self.width / 2, self.y - self.height / 2)
+            self.fire_cooldown_in = self.fire_cooldown
+            events.append("player_laser")
+
+    def animate_death(self, enemy_manager, events):
+        # Returns True on the tick the player respawns
+        if not self.death_sound_played:
+            events.append("player_dead")
+            self.death_sound_played = True
+        if self.death_animation_cooldown >= 120:
+            self.death_animation_cooldown = 0
+            self.lives -= 1
+            self.bullets.clear()
+            self.fire_cooldown_in = 0
+            self.is_dying = False
+            self.death_sound_played = False
+            self.x, self.y = WIDTH / 2 - self.width / 2, HEIGHT - self.height
+            self.prev_x, self.prev_y = self.x, self.y
+            enemy_manager.clear_bullets()
+            return True
+        self.death_animation_cooldown += 1
+        return False
+
+    def update(self, inputs, enemy_list, spaceship_enemy, walls, events) -> None:
+        if not self.is_dying:
+            self.prev_x, self.prev_y = self.x, self.y
+            self.apply_inputs(inputs, events)
+            self.rect.topleft = (self.x, self.y)
+            bullets = self.bullets
+            width, height = bullets.width, bullets.height
+            for bullet in bullets.live[:]:
+                bullets.move(bullet)
+                x, y = bullets.x[bullet], bullets.y[bullet]
+                # A bullet that hits something still finishes this tick's checks before it is recycled
+                spent = False
+                for index in enemy_list.overlapping(x, y, width, height):
+                    if not enemy_list.hit[index] and enemy_list.collide(index, bullets.mask, x, y):
+                        self.score += enemy_list.points(index)
+                        spent = True
+                        enemy_list.hit[index] = True
+                ship = spaceship_enemy
+                if ship is not None and rect_overlaps(x, y, width, height, ship) and bullets.collide(bullet, ship):
+                    self.score += ship.points
+                    spent = True
+                    ship.hit = True
+                for wall in walls.near(x, y, width, height):
+                    if bullets.collide(bullet, wall):
+                        wall.health -= 1
+                        wall.carve(bullets.mask, x, y, Wall.bullet_crater)
+                        spent = True
+                if spent or bullets.is_off_screen(bullet):
+                    bullets.release(bullet)
+
+
+class SpaceShip:
+    # Only numbers live on the ship; frames, masks and the points table belong to its EntityType
+    __slots__ = ("type", "points", "frame", "should_move_right", "x", "y", "prev_x", "prev_y", "vel", "hit",
+                 "death_animation_counter", "death_audio_played")
+
+    def __init__(self, should_move_right, rng):
+        self.type = entity_type("spaceship")
+        self.points = rng.choice(self.type.points)
+        self.frame = 0
+
+        self.should_move_right = should_move_right
+        if self.should_move_right:
+            self.x = -self.width
+        else:
+            self.x = WIDTH + self.width
+        self.y = 50
+        self.prev_x, self.prev_y = self.x, self.y
+
+        self.vel = 2 if self.should_move_right else -2
+
+        self.hit = False
+        self.death_animation_counter = 0
+        self.death_audio_played = False
+
+    @property
+    def width(self):
+        return self.type.width
+
+    @property
+    def height(self):
+        return self.type.height
+
+    @property
+    def image(self):
+        return self.type.frames[self.frame]
+
+    @property
+    def mask(self):
+        return self.type.masks[0]
+
+    def animate(self, player, events):
+        if not self.hit:
+            self.frame = (self.frame + 1) % len(self.type.frames)
+            if not player.is_dying:
+                events.append("spaceship_animation")
+
+    def is_off_screen(self):
+        return self.x <= -self.width or self.x >= WIDTH + self.width
+
+    def update(self, events):
+        # Returns False once the ship has flown off screen or finished its death animation
+        if not self.hit:
+            self.prev_x = self.x
+            self.x += self.vel
+            return not self.is_off_screen()
+        if not self.death_audio_played:
+            events.append(self.type.death_event)
+            self.death_audio_played = True
+        if self.death_animation_counter < 60:
+            self.death_animation_counter += 1
+            return True
+        return False
+
+
+def create_crater(radius):
+    size = radius * 2 + 1
+    crater = pygame.mask.Mask((size, size))
+    for x in range(size):
+        for y in range(size):
+            if (x - radius) ** 2 + (y - radius) ** 2 <= radius ** 2:
+                crater.set_at((x, y))
+    return crater
+
+
+class Wall(pygame.sprite.Sprite):
+    bullet_crater = create_crater(BULLET_CRATER_RADIUS)
+    crash_crater = create_crater(CRASH_CRATER_RADIUS)
+
+    def __init__(self, x, y, health=WALL_HEALTH):
+        super().__init__()
+        wall_type = entity_type("wall")
+        self.width, self.height = wall_type.width, wall_type.height
+        # Each wall erodes on its own, so it gets a private copy of the shared surface and mask
+        self.image = wall_type.frames[0].copy()
+        self.x, self.y = x, y
+        self.rect = self.image.get_rect()
+        self.mask = wall_type.masks[0].copy()
+        self.health = health
+        # Counts carved craters, so anything caching the wall's pixels can tell they changed
+        self.version = 0
+
+    def carve(self, mask, x, y, crater):
+        impact = self.mask.overlap(mask, (int(x - self.x), int(y - self.y)))
+        if impact is None:
+            return
+        offset = (impact[0] - crater.get_size()[0] // 2, impact[1] - crater.get_size()[1] // 2)
+        # Both calls only touch the pixels under the crater
+        self.mask.erase(crater, offset)
+        crater.to_surface(self.image, setcolor=(0, 0, 0, 0), unsetcolor=None, dest=offset)
+        self.version += 1
+
+    def update(self):
+        self.rect.topleft = (self.x, self.y)
+        if self.health <= 0:
+            self.kill()
+
+
+class WallGroup(pygame.sprite.Group):
+    def __init__(self):
+        super().__init__()
+        self.grid = SpatialGrid(WALL_SIZE[0])
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.grid.insert(sprite, sprite.x, sprite.y, sprite.width, sprite.height)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.grid.remove(sprite)
+
+    def near(self, x, y, width, height):
+        return [wall for wall in self.grid.query(x, y, width, height) if rect_overlaps(x, y, width, height, wall)]
+
+
+class BulletPool:
+    def __init__(self, name, capacity, vel):
+        bullet_type = entity_type(name)
+        self.width, self.height = bullet_type.width, bullet_type.height
+        self.image = bullet_type.frames[0]
+        self.mask = bullet_type.masks[0]
+        self.vel = vel
+
+        # One preallocated slot per bullet that can be in flight; firing and recycling only move slot numbers
+        # between the free stack and the live list, which keeps firing order
+        self.x = [0.0] * capacity
+        self.y = [0.0] * capacity
+        self.prev_y = [0.0] * capacity
+        self.owner = [0] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        self.live = []
+
+    def __len__(self):
+        return len(self.live)
+
+    def fire(self, x, y, owner=0):
+        if not self.free:
+            return None
+        bullet = self.free.pop()
+        self.x[bullet] = x - self.width / 2
+        self.y[bullet] = self.prev_y[bullet] = y + self.height / 2
+        self.owner[bullet] = owner
+        self.live.append(bullet)
+        return bullet
+
+    def release(self, bullet):
+        self.live.remove(bullet)
+        self.free.append(bullet)
+
+    def clear(self):
+        self.free.extend(self.live)
+        self.live.clear()
+
+    def move(self, bullet):
+        self.prev_y[bullet] = self.y[bullet]
+        self.y[bullet] += self.vel
+
+    def is_off_screen(self, bullet):
+        return not HEIGHT >= self.y[bullet] >= -self.height
+
+    def collide(self, bullet, obj):
+        profiler.count("collision_tests")
+        offset_x = obj.x - self.x[bullet]
+        offset_y = obj.y - self.y[bullet]
+        return self.mask.overlap(obj.mask, (offset_x, offset_y)) is not None
+
+    def sprites(self, alpha):
+        for bullet in self.live:
+            prev_y = self.prev_y[bullet]
+            yield self.image, (self.x[bullet], prev_y + (self.y[bullet] - prev_y) * alpha)
+
+
+def create_new_walls(group, health=WALL_HEALTH):
+    x_pos, y_pos = 100, 350
+    for i in range(4):
+        group.add(Wall(x_pos, y_pos, health))
+        x_pos += 200
+
+
+# Entity types of the invaders, indexed by Formation.kind
+ENEMY_TYPES = ["enemy1", "enemy2", "enemy3"]
+ENEMY_DEATH_FRAMES = 5
+FORMATION_CELL_SIZE = 64
+
+
+class Formation:
+    def __init__(self, bullet_limit=1):
+        self.types = [entity_type(name) for name in ENEMY_TYPES]
+        self.width, self.height = self.types[0].width, self.types[0].height
+        self.frames = [enemy_type.frames for enemy_type in self.types]
+        self.masks = [enemy_type.masks[0] for enemy_type in self.types]
+        self.death_frames = get_frames("enemy-death")
+        self.points_table = np.array([enemy_type.points for enemy_type in self.types])
+
+        # Structure of arrays, one slot per invader
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+        self.hit = np.zeros(0, dtype=bool)
+        self.kind = np.zeros(0, dtype=np.int8)
+        self.frame = np.zeros(0, dtype=np.int8)
+        self.death_tick = np.zeros(0, dtype=np.int8)
+        self.bullet_count = np.zeros(0, dtype=np.int16)
+
+        # Invaders only ever move together, so the broadphase grid is built once per wave over their
+        # starting positions and queries are shifted by how far the formation has travelled since
+        self.grid = SpatialGrid(FORMATION_CELL_SIZE)
+        self.offset_x, self.offset_y = 0, 0
+
+        self.vel = 10
+        self.bullets = BulletPool("enemy_bullet", ENEMY_BULLET_CAPACITY, 5)
+        self.bullet_limit = bullet_limit
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    @property
+    def should_move_right(self):
+        return self.vel > 0
+
+    def reset(self, x, y, kind):
+        count = len(x)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.kind = np.asarray(kind, dtype=np.int8)
+        self.alive = np.ones(count, dtype=bool)
+        self.hit = np.zeros(count, dtype=bool)
+        self.frame = np.zeros(count, dtype=np.int8)
+        self.death_tick = np.zeros(count, dtype=np.int8)
+        self.bullet_count = np.zeros(count, dtype=np.int16)
+        self.vel = 10
+        self.bullets.clear()
+
+        self.offset_x, self.offset_y = 0, 0
+        self.grid.clear()
+        self.grid.insert_many(range(count), self.x, self.y, self.width, self.height)
+
+    def animate(self):
+        self.frame[self.alive & ~self.hit] ^= 1
+
+    def is_too_low(self):
+        return bool((self.y[self.alive] >= 450).any())
+
+    def move(self, dx, dy):
+        self.x[self.alive] += dx
+        self.y[self.alive] += dy
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def overlapping(self, x, y, width, height):
+        candidates = np.array(self.grid.query(x - self.offset_x, y - self.offset_y, width, height), dtype=int)
+        if not len(candidates):
+            return candidates
+        candidate_x, candidate_y = self.x[candidates], self.y[candidates]
+        return candidates[self.alive[candidates] & (candidate_x < x + width) & (candidate_x + self.width > x)
+                          & (candidate_y < y + height) & (candidate_y + self.height > y)]
+
+    def collide(self, index, mask, x, y):
+        profiler.count("collision_tests")
+        offset = (int(x - self.x[index]), int(y - self.y[index]))
+        return self.masks[self.kind[index]].overlap(mask, offset) is not None
+
+    def points(self, index):
+        return int(self.points_table[self.kind[index]])
+
+    def shoot(self, rng, odds=DEFAULT_DIFFICULTY["enemy_fire_odds"]):
+        indices = np.flatnonzero(self.alive)
+        index = indices[rng.randrange(len(indices))]
+        if self.bullet_count[index] < self.bullet_limit:
+            # Draws the same numbers as the original randint(0, 10) == 1 at the stock odds of 11, so recorded
+            # replays stay valid; odds of 1 always fire
+            if rng.randrange(odds) == 1 % odds:
+                self.fire(index)
+
+    def fire(self, index):
+        if self.bullets.fire(self.x[index] + self.width / 2, self.y[index] - self.height / 2, index) is not None:
+            self.bullet_count[index] += 1
+
+    def remove_bullet(self, bullet):
+        self.bullet_count[self.bullets.owner[bullet]] -= 1
+        self.bullets.release(bullet)
+
+    def clear_bullets(self):
+        self.bullets.clear()
+        self.bullet_count[:] = 0
+
+    def animate_death(self, events):
+        dying = self.alive & self.hit
+        self.death_tick[dying] = np.minimum(self.death_tick[dying] + 1, ENEMY_DEATH_FRAMES + 1)
+        events.extend(self.types[kind].death_event for kind in self.kind[dying & (self.death_tick == 1)])
+        # Dead invaders stay hidden in their slot until their last bullet is gone
+        finished = dying & (self.death_tick > ENEMY_DEATH_FRAMES) & (self.bullet_count == 0)
+        self.alive[finished] = False
+
+    def update(self, player, walls, events):
+        self.animate_death(events)
+
+        bullets = self.bullets
+        width, height = bullets.width, bullets.height
+        for bullet in bullets.live[:]:
+            bullets.move(bullet)
+            x, y = bullets.x[bullet], bullets.y[bullet]
+            hit_wall = False
+            for wall in walls.near(x, y, width, height):
+                if bullets.collide(bullet, wall):
+                    wall.health -= 1
+                    wall.carve(bullets.mask, x, y, Wall.bullet_crater)
+                    hit_wall = True
+            if hit_wall or bullets.is_off_screen(bullet):
+                self.remove_bullet(bullet)
+            elif rect_overlaps(x, y, width, height, player) and bullets.collide(bullet, player):
+                player.is_dying = True
+
+        for wall in walls:
+            for index in self.overlapping(wall.x, wall.y, wall.width, wall.height):
+                if self.collide(index, wall.mask, wall.x, wall.y):
+                    wall.health -= 5
+                    wall.carve(self.masks[self.kind[index]], self.x[index], self.y[index], Wall.crash_crater)
+                    self.alive[index] = False
+
+    def sprites(self):
+        visible = np.flatnonzero(self.alive & (self.death_tick <= ENEMY_DEATH_FRAMES))
+        for index in visible:
+            if self.hit[index]:
+                image = self.death_frames[self.death_tick[index] - 1]
+            else:
+                image = self.frames[self.kind[index]][self.frame[index]]
+            yield image, (self.x[index], self.y[index])
+
+
+def create_new_enemies(formation, y, count=50):
+    # The classic wave is 5 rows of 10; bigger swarms are packed into the same block of screen
+    columns = 10 if count <= 50 else int(np.ceil(np.sqrt(count * 4)))
+    rows = int(np.ceil(count / columns))
+    index = np.arange(count)
+    row = index // columns
+    x = 200 + (index % columns) * (500 / columns)
+    y = y + row * min(25, 250 / rows)
+    # Top fifth of the rows are worth 50, the next two fifths 25, the rest 10
+    kind = np.where(row < rows / 5, 2, np.where(row < rows * 3 / 5, 1, 0))
+    formation.reset(x, y, kind)
+
+
+def lower_enemies(formation, speedup):
+    formation.move(0, 20)
+    formation.vel *= -1
+    formation.animate()
+    return speedup
+
+
+def manage_enemy_movement(formation, drop_speedup=DEFAULT_DIFFICULTY["drop_speedup"]):
+    right_limit = WIDTH - SCREEN_MARGIN - 32
+    left_limit = SCREEN_MARGIN
+    active_x = formation.x[formation.alive]
+    if not len(active_x):
+        return 0
+    right_limit_reached = formation.should_move_right and active_x.max() >= right_limit
+    left_limit_reached = not formation.should_move_right and active_x.min() <= left_limit
+    decrement_amount = 0
+    if left_limit_reached or right_limit_reached:
+        decrement_amount = lower_enemies(formation, drop_speedup)
+    else:
+        formation.move(formation.vel, 0)
+        formation.animate()
+    return decrement_amount
+
+
+def ms_to_ticks(ms):
+    return max(1, round(ms / TICK_MS))
+
+
+class Simulation:
+    def __init__(self, seed=None, swarm_size=50, difficulty=None):
+        # An empty wave would count as cleared on every tick
+        if swarm_size < 1:
+            raise ValueError(f"a wave needs at least one invader, not {swarm_size}")
+        self.seed = seed
+        self.swarm_size = swarm_size
+        self.rng = random.Random(seed)
+        self.difficulty = difficulty = difficulty or Difficulty()
+
+        self.base_movement_ratio = difficulty.base_movement_ratio
+        self.movement_ratio = self.base_movement_ratio
+        self.move_enemies_in = ms_to_ticks(self.movement_ratio)
+
+        self.animate_spaceship_rate = 800
+        self.animate_spaceship_in = ms_to_ticks(self.animate_spaceship_rate)
+
+        self.enemy_shoot_rate = difficulty.enemy_shoot_rate
+        self.enemy_shoot_in = ms_to_ticks(self.enemy_shoot_rate)
+
+        self.player = pygame.sprite.GroupSingle()
+        # The stock cooldown is the shortest gap between shots a single bullet allows, so it only matters
+        # once the limit is raised
+        self.player.add(Player(difficulty.player_bullet_limit, ms_to_ticks(difficulty.player_fire_cooldown)))
+
+        self.enemy_start_y = difficulty.enemy_start_y
+        self.enemy_manager = Formation(difficulty.enemy_bullet_limit)
+        create_new_enemies(self.enemy_manager, self.enemy_start_y, self.swarm_size)
+
+        self.spaceship_enemy = None
+        self.spaceship_should_move_right_options = [True, False]
+
+        self.walls = WallGroup()
+        create_new_walls(self.walls, difficulty.wall_health)
+
+        self.current_level = 1
+        self.ticks = 0
+        self.game_over = False
+        self.events = []
+
+        self.march_beat = 0
+
+    def is_game_over(self):
+        return self.player.sprite.lives <= 0 or self.enemy_manager.is_too_low()
+
+    def run_timers(self):
+        player = self.player.sprite
+        difficulty = self.difficulty
+
+        self.move_enemies_in -= 1
+        if self.move_enemies_in <= 0:
+            if not player.is_dying:
+                self.movement_ratio -= manage_enemy_movement(self.enemy_manager, difficulty.drop_speedup)
+                if self.movement_ratio < difficulty.min_movement_ratio:
+                    self.movement_ratio = difficulty.min_movement_ratio
+                if player.lives > 0:
+                    self.events.append(f"enemy_animation_{self.march_beat}")
+                    self.march_beat = (self.march_beat + 1) % 4
+            self.move_enemies_in = ms_to_ticks(self.movement_ratio)
+
+        self.animate_spaceship_in -= 1
+        if self.animate_spaceship_in <= 0:
+            if self.spaceship_enemy is not None:
+                self.spaceship_enemy.animate(player, self.events)
+            self.animate_spaceship_in = ms_to_ticks(self.animate_spaceship_rate)
+
+        self.enemy_shoot_in -= 1
+        if self.enemy_shoot_in <= 0:
+            if self.enemy_manager and not player.is_dying:
+                self.enemy_manager.shoot(self.rng, difficulty.enemy_fire_odds)
+            self.enemy_shoot_in = ms_to_ticks(self.enemy_shoot_rate)
+
+    def next_level(self):
+        difficulty = self.difficulty
+        self.march_beat = 0
+
+        self.spaceship_enemy = None
+
+        if self.current_level <= difficulty.enemy_start_y_levels:
+            self.enemy_start_y += difficulty.enemy_start_y_step
+
+        create_new_enemies(self.enemy_manager, self.enemy_start_y, self.swarm_size)
+        self.player.sprite.lives += 1
+        self.current_level += 1
+
+        self.base_movement_ratio -= difficulty.level_speedup
+        if self.base_movement_ratio <= difficulty.min_movement_ratio:
+            self.base_movement_ratio = difficulty.min_movement_ratio
+        self.movement_ratio = self.base_movement_ratio
+        self.move_enemies_in = ms_to_ticks(self.movement_ratio)
+        self.enemy_shoot_rate *= difficulty.enemy_shoot_decay
+        self.enemy_shoot_rate = round(self.enemy_shoot_rate)
+        self.enemy_shoot_in = ms_to_ticks(self.enemy_shoot_rate)
+
+    def step(self, inputs=0):
+        self.events = []
+        if self.game_over:
+            return self.events
+
+        player = self.player.sprite
+        self.ticks += 1
+        self.run_timers()
+
+        if player.is_dying:
+            if player.animate_death(self.enemy_manager, self.events):
+                self.spaceship_enemy = None
+        else:
+            with profiler.scope("player"):
+                self.player.update(inputs, self.enemy_manager, self.spaceship_enemy, self.walls, self.events)
+
+            if self.rng.randint(1, self.difficulty.spaceship_spawn_odds) == 1 and self.spaceship_enemy is None:
+                self.spaceship_enemy = SpaceShip(self.rng.choice(self.spaceship_should_move_right_options), self.rng)
+
+            if not self.enemy_manager:
+                self.next_level()
+
+            with profiler.scope("formation"):
+                self.enemy_manager.update(player, self.walls, self.events)
+
+            with profiler.scope("spaceship"):
+                if self.spaceship_enemy is not None and not self.spaceship_enemy.update(self.events):
+                    self.spaceship_enemy = None
+            with profiler.scope("walls"):
+                self.walls.update()
+
+        if self.is_game_over():
+            self.game_over = True
+            self.events.append("game_over")
+        return self.events
@@ -0,0 +1,100 @@
+import concurrent.futures
+import queue
+import threading
+
+import pygame
+
+# Cue name: (path, volume)
+SOUND_CUES = {
+    "player_dead": ("Audio/player_dead.wav", 0.4),
+    "player_laser": ("Audio/player_laser.wav", 0.25),
+    "enemy_dead": ("Audio/enemy_dead.wav", 0.15),
+    "spaceship_animation": ("Audio/spaceship_animation.wav", 0.1),
+    "spaceship_dead": ("Audio/spaceship_dead.wav", 0.4),
+    "game_over": ("Audio/game_over.wav", 0.3),
+    "new_high_score": ("Audio/new_high_score.wav", 0.3),
+    "enemy_animation_0": ("Audio/Enemy_Animation/enemy_animation_0.wav", 0.2),
+    "enemy_animation_1": ("Audio/Enemy_Animation/enemy_animation_1.wav", 0.2),
+    "enemy_animation_2": ("Audio/Enemy_Animation/enemy_animation_2.wav", 0.2),
+    "enemy_animation_3": ("Audio/Enemy_Animation/enemy_animation_3.wav", 0.2),
+}
+CHANNEL_POOL_SIZE = 8
+
+
+class SoundBank:
+    def __init__(self, cues=None, pool_size=CHANNEL_POOL_SIZE):
+        self.cues = SOUND_CUES if cues is None else cues
+        self.pool_size = pool_size
+        self.sounds = {}
+        self.channels = []
+        self.started_at = []
+        self.commands = queue.SimpleQueue()
+        self.worker = None
+        self.loading = []
+
+    def _decode(self, name, path, volume):
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(volume)
+        self.sounds[name] = sound
+
+    def load(self, executor=None):
+        # Without a mixer (headless runs, no audio device) every cue is silently dropped
+        if not pygame.mixer.get_init():
+            return
+        if pygame.mixer.get_num_channels() < self.pool_size:
+            pygame.mixer.set_num_channels(self.pool_size)
+        pygame.mixer.set_reserved(self.pool_size)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.pool_size)]
+        self.started_at = [0] * self.pool_size
+        # With an executor the WAVs decode on the pool, and a cue that isn't ready yet is skipped
+        for name, (path, volume) in self.cues.items():
+            if executor is None:
+                self._decode(name, path, volume)
+            else:
+                self.loading.append(executor.submit(self._decode, name, path, volume))
+
+    def wait(self):
+        # Blocks until the cues queued by load() have decoded; one that failed to decode just stays silent
+        concurrent.futures.wait(self.loading)
+
+    def start(self):
+        # Cues are handed to a worker thread so choosing and starting a channel never stalls a frame
+        self.worker = threading.Thread(target=self._run_commands, daemon=True)
+        self.worker.start()
+
+    def close(self):
+        if self.worker is not None:
+            self.commands.put(None)
+            self.worker.join()
+            self.worker = None
+
+    def _run_commands(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            command()
+
+    def play(self, name):
+        if self.worker is None:
+            self._play(name)
+        else:
+            self.commands.put(lambda: self._play(name))
+
+    def _play(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return
+        # Use a free channel if there is one, otherwise steal the voice that has been playing longest
+        index = 0
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                index = i
+                break
+            if self.started_at[i] < self.started_at[index]:
+                index = i
+        self.channels[index].play(sound)
+        self.started_at[index] = pygame.time.get_ticks()
+
+
+sound_bank = SoundBank()
@@ -0,0 +1,171 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import statistics
+import time
+
+from headless import DEFAULT_MAX_TICKS, run_game, swarm_size
+from simulation import DEFAULT_DIFFICULTY, SIM_HZ, Difficulty
+
+SWEEP_RESULTS_FILE = "sweep_results.csv"
+
+# A run is identified by its knobs, swarm size, seed and tick limit; these columns are how a resumed sweep
+# recognises the runs that already finished
+RUN_COLUMNS = list(DEFAULT_DIFFICULTY) + ["swarm", "seed", "max_ticks"]
+RESULT_COLUMNS = ["level", "score", "ticks", "survival_s", "game_over", "elapsed_s", "ticks_per_s"]
+COLUMNS = RUN_COLUMNS + RESULT_COLUMNS
+
+
+def parse_value(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    raise ValueError(f"{text!r} is not a number")
+
+
+def parse_param(text):
+    name, separator, values = text.partition("=")
+    if not separator or name not in DEFAULT_DIFFICULTY:
+        raise argparse.ArgumentTypeError(f"expected KNOB=V1,V2,... with KNOB one of {', '.join(DEFAULT_DIFFICULTY)}")
+    try:
+        values = [parse_value(value) for value in values.split(",")]
+        for value in values:
+            Difficulty(**{name: value})
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return name, values
+
+
+def load_grid(path):
+    with open(path, "r") as grid_file:
+        grid = json.load(grid_file)
+    unknown = set(grid) - set(DEFAULT_DIFFICULTY)
+    if unknown:
+        raise ValueError(f"{path}: unknown difficulty knobs: {', '.join(sorted(unknown))}")
+    grid = {name: values if isinstance(values, list) else [values] for name, values in grid.items()}
+    for name, values in grid.items():
+        for value in values:
+            try:
+                Difficulty(**{name: value})
+            except ValueError as error:
+                raise ValueError(f"{path}: {error}")
+    return grid
+
+
+def expand_grid(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield {**DEFAULT_DIFFICULTY, **dict(zip(names, values))}
+
+
+def run_key(row):
+    # Rows read back from the file are all strings, so runs are compared by their written form
+    return tuple(str(row[column]) for column in RUN_COLUMNS)
+
+
+def read_finished(path):
+    if not os.path.exists(path):
+        return set()
+    # A sweep killed mid-write can leave half a row behind; drop it so appended rows start on a fresh line
+    with open(path, "rb+") as results_file:
+        data = results_file.read()
+        if data and not data.endswith(b"\n"):
+            results_file.truncate(data.rfind(b"\n") + 1)
+    with open(path, "r", newline="") as results_file:
+        reader = csv.DictReader(results_file)
+        if reader.fieldnames and reader.fieldnames != COLUMNS:
+            raise ValueError(f"{path} has different columns; it was written for other knobs")
+        return {run_key(row) for row in reader}
+
+
+def play(run):
+    difficulty = Difficulty(**{name: run[name] for name in DEFAULT_DIFFICULTY})
+    start = time.perf_counter()
+    sim = run_game(run["seed"], run["max_ticks"], swarm_size=run["swarm"], difficulty=difficulty)
+    elapsed = time.perf_counter() - start
+    return {
+        **run,
+        "level": sim.current_level,
+        "score": sim.player.sprite.score,
+        "ticks": sim.ticks,
+        "survival_s": round(sim.ticks / SIM_HZ, 2),
+        "game_over": int(sim.game_over),
+        "elapsed_s": round(elapsed, 3),
+        "ticks_per_s": round(sim.ticks / elapsed),
+    }
+
+
+def summarize(path):
+    groups = {}
+    with open(path, "r", newline="") as results_file:
+        for row in csv.DictReader(results_file):
+            groups.setdefault(tuple(row[name] for name in DEFAULT_DIFFICULTY), []).append(row)
+    changed = [index for index, name in enumerate(DEFAULT_DIFFICULTY)
+               if len({knobs[index] for knobs in groups}) > 1]
+    for knobs, rows in groups.items():
+        label = ", ".join(f"{list(DEFAULT_DIFFICULTY)[index]}={knobs[index]}" for index in changed) or "defaults"
+        print(f"{label}: {len(rows)} games, level {statistics.fmean(int(row['level']) for row in rows):.2f}, "
+              f"score {statistics.fmean(int(row['score']) for row in rows):.0f}, "
+              f"survival {statistics.fmean(float(row['survival_s']) for row in rows):.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded bot games over a grid of difficulty settings.")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], metavar="KNOB=V1,V2,...",
+                        help="values to try for one knob; repeat for more knobs")
+    parser.add_argument("--grid", help="JSON object mapping knobs to lists of values")
+    parser.add_argument("--games", type=int, default=10, help="seeded games per combination")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, later games count up")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS, help="stop a game after this many ticks")
+    parser.add_argument("--swarm", type=swarm_size, default=50, help="invaders per wave")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes playing games")
+    parser.add_argument("--output", default=SWEEP_RESULTS_FILE,
+                        help="CSV results file; runs already in it are skipped")
+    args = parser.parse_args()
+
+    try:
+        grid = load_grid(args.grid) if args.grid else {}
+    except ValueError as error:
+        parser.error(str(error))
+    grid.update(args.param)
+    runs = [{**knobs, "swarm": args.swarm, "seed": seed, "max_ticks": args.max_ticks}
+            for knobs in expand_grid(grid) for seed in range(args.seed, args.seed + args.games)]
+
+    finished = read_finished(args.output)
+    pending = [run for run in runs if run_key(run) not in finished]
+    print(f"{len(runs)} runs, {len(runs) - len(pending)} already in {args.output}, {len(pending)} to play "
+          f"on {args.workers} workers")
+
+    write_header = not finished and not (os.path.exists(args.output) and os.path.getsize(args.output))
+    start = time.perf_counter()
+    total_ticks = 0
+    # Each row is flushed as soon as its game ends, so an interrupted sweep loses only the games in flight
+    with open(args.output, "a", newline="") as results_file, multiprocessing.Pool(args.workers) as pool:
+        writer = csv.DictWriter(results_file, COLUMNS)
+        if write_header:
+            writer.writeheader()
+        try:
+            for done, result in enumerate(pool.imap_unordered(play, pending), 1):
+                writer.writerow(result)
+                results_file.flush()
+                total_ticks += result["ticks"]
+                print(f"[{done}/{len(pending)}] seed {result['seed']}: level {result['level']}, "
+                      f"score {result['score']}, {result['ticks_per_s']} ticks/s")
+        except KeyboardInterrupt:
+            pool.terminate()
+            print(f"interrupted; run again with the same arguments to resume from {args.output}")
+            return
+    elapsed = time.perf_counter() - start
+
+    if pending:
+        print(f"{len(pending)} games, {total_ticks} ticks in {elapsed:.2f}s ({total_ticks / elapsed:.0f} ticks/s)")
+    summarize(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+from collections import OrderedDict
+
+from profiler import profiler
+
+TEXT_CACHE_SIZE = 256
+
+_labels = OrderedDict()
+
+
+def render_text(font, text, color):
+    key = (font, text, color)
+    label = _labels.get(key)
+    if label is None:
+        with profiler.scope("text"):
+            label = font.render(text, True, color)
+        profiler.count("text_renders")
+        _labels[key] = label
+        # Evict the least recently used label once the cache is full
+        if len(_labels) > TEXT_CACHE_SIZE:
+            _labels.popitem(last=False)
+    else:
+        _labels.move_to_end(key)
+    return label